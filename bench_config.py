@@ -0,0 +1,99 @@
+"""
+Microbenchmark comparing config access through the frozen Config snapshot with the
+previous approach of looking values up in the parsed TOML dict and converting them on
+every access. The access pattern is the one CritterSprite.update makes for each critter.
+"""
+
+import argparse
+import sys
+import timeit
+import toml
+from config import config
+
+
+class DictConfig:
+    """
+    The previous config access pattern: a nested dict lookup and a type conversion on
+    every property access.
+    """
+
+    def __init__(self, path):
+        self._config = toml.load(path)
+
+    @property
+    def screen_width(self) -> int:
+        return int(self._config['screen']['width'])
+
+    @property
+    def screen_height(self) -> int:
+        return int(self._config['screen']['height'])
+
+    @property
+    def critter_energy_scale(self) -> float:
+        return float(self._config['critter']['energy_scale'])
+
+    @property
+    def critter_max_energy(self) -> float:
+        return float(self._config['critter']['max_energy'])
+
+    @property
+    def critter_can_die_of_old_age(self) -> bool:
+        return bool(self._config['critter']['old_age_active'])
+
+    @property
+    def critter_mating_cooldown(self) -> int:
+        return int(self._config['critter']['mating_cooldown'])
+
+    @property
+    def critter_min_mating_energy(self) -> int:
+        return int(self._config['critter']['energy_to_mate'])
+
+
+def critter_update_accesses(cfg):
+    """
+    Reads the parameters that one critter's update reads, the same number of times.
+    """
+    # deplete_energy
+    cfg.critter_energy_scale
+    # handle_edge_collision
+    cfg.screen_height
+    cfg.screen_height
+    cfg.screen_width
+    cfg.screen_width
+    # check_food_collision
+    cfg.critter_max_energy
+    # identify_mates
+    cfg.critter_mating_cooldown
+    cfg.critter_min_mating_energy
+    # update
+    cfg.critter_can_die_of_old_age
+
+
+def main(argv):
+    """
+    Times a frame's worth of config accesses with each approach and prints the saving.
+    @param argv The command line arguments, excluding the program name.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark config access per frame.")
+    parser.add_argument("--critters", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    dict_config = DictConfig("config.toml")
+    for critters in args.critters:
+        results = {}
+        for name, cfg in (("dict", dict_config), ("snapshot", config)):
+            def frame(cfg=cfg):
+                for _ in range(critters):
+                    critter_update_accesses(cfg)
+            results[name] = min(timeit.repeat(frame, number=10, repeat=args.repeat)) / 10
+        saving = results["dict"] - results["snapshot"]
+        print(
+            f"{critters:>7} critters: dict {results['dict'] * 1000:8.3f} ms/frame, "
+            f"snapshot {results['snapshot'] * 1000:8.3f} ms/frame, "
+            f"saving {saving * 1000:8.3f} ms/frame ({results['dict'] / results['snapshot']:.1f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
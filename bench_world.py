@@ -0,0 +1,199 @@
+"""
+Benchmark of the simulation's update and drawing phases at several population sizes.
+The world is built by a Simulation, as in main.py, on SDL's dummy video driver, and
+each phase of a frame is timed separately. The results are written to a JSON file so
+that runs from different commits can be compared with --compare.
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+# pylint: disable=C0413
+import numpy as np
+import pygame
+from config import config
+from creature_sprite import CritterSprite
+from food_sprite import FoodSprite
+from sidebar import Sidebar
+from simulation import SIDEBAR_LABELS, Simulation
+
+PHASES = ("step", "food_update", "draw", "sidebar", "flip")
+
+
+def build_world(count, food, engine, seed):
+    """
+    Creates a simulation with count critters and up to food items of food. Food grows
+    in patches of the configured capacity, as in a real run, so it may fall short.
+    @param count The number of critters.
+    @param food The number of items of food to try to create.
+    @param engine Either "sprite" or "numpy".
+    @param seed The random seed, so that every run builds the same world.
+    @return The Simulation.
+    """
+    CritterSprite.died_of_old_age = 0
+    CritterSprite.died_of_no_energy = 0
+    CritterSprite.next_id = 1
+    FoodSprite.next_id = 1
+
+    world = Simulation(engine=engine, seed=seed)
+    if world.critter_engine is not None:
+        world.critter_engine.attach_views((world.critters_group,))
+    world.populate(food, count)
+    return world
+
+
+def time_frame(world, screen, sidebar):
+    """
+    Runs one frame of a world built by build_world, timing each phase. The step phase
+    is the simulation's own step, so it includes births and food spawning.
+    @return The time taken by each phase, in seconds, keyed by the names in PHASES.
+    """
+    timings = {}
+    critters_group = world.critters_group
+    food_group = world.food_group
+    engine = world.critter_engine
+
+    start = time.perf_counter()
+    world.step()
+    timings["step"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    food_group.update()
+    timings["food_update"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    if engine is not None:
+        engine.sync_views()
+    else:
+        CritterSprite.sync_rects(critters_group)
+    screen.fill(config.screen_back_colour)
+    food_group.draw(screen)
+    critters_group.draw(screen)
+    timings["draw"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    sidebar.draw(screen, world.sidebar_values())
+    timings["sidebar"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    pygame.display.flip()
+    timings["flip"] = time.perf_counter() - start
+    return timings
+
+
+def run_benchmark(counts, food, engine, ticks, seed):
+    """
+    Times ticks frames at each population size.
+    @return A list with one result per population size, giving the mean and minimum
+    milliseconds per frame of each phase.
+    """
+    pygame.init()
+    screen = pygame.display.set_mode((config.screen_width, config.screen_height))
+    sidebar = Sidebar(SIDEBAR_LABELS, config.sidebar_width, config.screen_height,
+                      config.sidebar_colour, config.sidebar_opacity)
+    results = []
+    for count in counts:
+        world = build_world(count, food, engine, seed)
+        food_at_start = world.food_count()
+        samples = {phase: [] for phase in PHASES}
+        for _ in range(ticks):
+            for phase, seconds in time_frame(world, screen, sidebar).items():
+                samples[phase].append(seconds * 1000)
+        result = {
+            "count": count,
+            "food_at_start": food_at_start,
+            "critters_at_end": world.critter_count(),
+            "phases": {
+                phase: {"mean_ms": float(np.mean(values)), "min_ms": float(np.min(values))}
+                for phase, values in samples.items()
+            },
+        }
+        results.append(result)
+        print(f"{count:>7}: " + ", ".join(
+            f"{phase} {values['mean_ms']:.3f}" for phase, values in result["phases"].items()
+        ) + " ms/frame")
+    return results
+
+
+def git_commit() -> str:
+    """
+    Returns the current commit, or an empty string if it cannot be found.
+    """
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def compare(report, baseline):
+    """
+    Prints the ratio of each phase's mean time to the baseline's, for the population
+    sizes that both reports contain. Ratios below 1 are improvements.
+    """
+    previous = {result["count"]: result["phases"] for result in baseline["results"]}
+    food = baseline.get("food", "unrecorded")
+    print(f"Compared with {baseline['commit'] or 'baseline'} ({baseline['engine']} engine, "
+          f"{food} food):")
+    for result in report["results"]:
+        old = previous.get(result["count"])
+        if old is None:
+            continue
+        ratios = ", ".join(
+            f"{phase} {values['mean_ms'] / old[phase]['mean_ms']:.2f}x"
+            for phase, values in result["phases"].items()
+            if phase in old and old[phase]["mean_ms"] > 0
+        )
+        print(f"{result['count']:>7}: {ratios}")
+
+
+def main(argv):
+    """
+    Runs the benchmark and writes the results.
+    @param argv The command line arguments, excluding the program name.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark simulation and render phases.")
+    parser.add_argument("--counts", type=int, nargs="+", default=[100, 1000, 10000, 100000],
+                        help="Population sizes to benchmark.")
+    parser.add_argument("--engine", choices=("sprite", "numpy"), default=config.simulation_engine)
+    parser.add_argument("--food", type=int, default=config.food_initial_count,
+                        help="Items of food to create at each size, up to the patch capacity.")
+    parser.add_argument("--ticks", type=int, default=10, help="Frames to time at each size.")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", default="bench_world.json", help="JSON file to write.")
+    parser.add_argument("--compare", help="A previous JSON file to compare the results with.")
+    args = parser.parse_args(argv)
+
+    report = {
+        "commit": git_commit(),
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "pygame": pygame.version.ver,
+        "numpy": np.__version__,
+        "engine": args.engine,
+        "food": args.food,
+        "ticks": args.ticks,
+        "seed": args.seed,
+        "results": run_benchmark(args.counts, args.food, args.engine, args.ticks, args.seed),
+    }
+    with open(args.output, "w", encoding="utf-8") as output:
+        json.dump(report, output, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as baseline:
+            compare(report, json.load(baseline))
+
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,110 @@
+"""
+A camera that shows part of the world in the application window, with panning and
+zooming from the mouse and keyboard.
+"""
+
+# pylint: disable=E1101
+import pygame
+
+# How far one arrow key press pans, as a fraction of the window.
+PAN_STEP = 0.1
+# How much one mouse wheel step or +/- key press zooms in or out.
+ZOOM_STEP = 1.25
+# The furthest the camera zooms in, in window pixels per world pixel.
+MAX_ZOOM = 8.0
+
+
+class Camera:
+    """
+    Maps a rectangle of the world onto the window. The camera is described by the world
+    point at the centre of the window and by its zoom, in window pixels per world pixel.
+    The centre is kept inside the world, and the camera cannot zoom out beyond showing
+    the whole world.
+    """
+
+    def __init__(self, world_width, world_height, view_width, view_height):
+        """
+        Constructor for the Camera class. The camera starts by showing the whole world.
+        @param world_width, world_height The size of the world.
+        @param view_width, view_height The size of the window.
+        """
+        self.world_width = world_width
+        self.world_height = world_height
+        self.view_width = view_width
+        self.view_height = view_height
+        self.min_zoom = min(view_width / world_width, view_height / world_height)
+        self.zoom = self.min_zoom
+        self.centre_x = world_width / 2
+        self.centre_y = world_height / 2
+        self._dragging = False
+
+    def fit(self):
+        """
+        Zooms out and centres the camera so that the whole world is visible.
+        """
+        self.zoom = self.min_zoom
+        self.centre_x = self.world_width / 2
+        self.centre_y = self.world_height / 2
+
+    def visible_rect(self) -> tuple:
+        """
+        Returns the part of the world that is visible, as (left, top, width, height) in
+        world pixels.
+        """
+        width = self.view_width / self.zoom
+        height = self.view_height / self.zoom
+        return (self.centre_x - width / 2, self.centre_y - height / 2, width, height)
+
+    def pan(self, dx, dy):
+        """
+        Moves the view by (dx, dy) window pixels.
+        """
+        self.centre_x = min(max(self.centre_x + dx / self.zoom, 0.0), self.world_width)
+        self.centre_y = min(max(self.centre_y + dy / self.zoom, 0.0), self.world_height)
+
+    def zoom_at(self, factor, x, y):
+        """
+        Zooms by a factor, keeping the world point under the window point (x, y) where
+        it is.
+        """
+        zoom = min(max(self.zoom * factor, self.min_zoom), MAX_ZOOM)
+        offset_x = x - self.view_width / 2
+        offset_y = y - self.view_height / 2
+        self.pan(offset_x, offset_y)
+        self.zoom = zoom
+        self.pan(-offset_x, -offset_y)
+
+    def handle_event(self, event):
+        """
+        Pans and zooms in response to a pygame event. The mouse wheel zooms around the
+        pointer and dragging with the right mouse button pans; the arrow keys pan, + and
+        - zoom around the centre of the window, and Home shows the whole world.
+        """
+        if event.type == pygame.MOUSEWHEEL:
+            x, y = pygame.mouse.get_pos()
+            self.zoom_at(ZOOM_STEP ** event.y, x, y)
+        elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 3:
+            self._dragging = True
+        elif event.type == pygame.MOUSEBUTTONUP and event.button == 3:
+            self._dragging = False
+        elif event.type == pygame.MOUSEMOTION and self._dragging:
+            self.pan(-event.rel[0], -event.rel[1])
+        elif event.type == pygame.KEYDOWN:
+            step_x = self.view_width * PAN_STEP
+            step_y = self.view_height * PAN_STEP
+            centre = (self.view_width / 2, self.view_height / 2)
+            match event.key:
+                case pygame.K_LEFT:
+                    self.pan(-step_x, 0)
+                case pygame.K_RIGHT:
+                    self.pan(step_x, 0)
+                case pygame.K_UP:
+                    self.pan(0, -step_y)
+                case pygame.K_DOWN:
+                    self.pan(0, step_y)
+                case pygame.K_EQUALS | pygame.K_PLUS | pygame.K_KP_PLUS:
+                    self.zoom_at(ZOOM_STEP, *centre)
+                case pygame.K_MINUS | pygame.K_KP_MINUS:
+                    self.zoom_at(1 / ZOOM_STEP, *centre)
+                case pygame.K_HOME:
+                    self.fit()
@@ -0,0 +1,104 @@
+"""
+Checkpoints of the whole simulation as compressed NumPy .npz files. Every critter and
+item of food is stored column by column, along with the counters and random number
+generator states needed to carry on exactly where the run left off.
+"""
+
+import json
+import os
+import queue
+import threading
+import numpy as np
+
+CHECKPOINT_VERSION = 1
+
+
+def write_checkpoint(path, state):
+    """
+    Writes a checkpoint. The file is written under a temporary name and then renamed,
+    so an interrupted write never replaces a good checkpoint with a broken one.
+    @param path The path of the checkpoint file.
+    @param state A dict of "critters" and "food" dicts of arrays, "rng_state" (a
+    JSON-serialisable object) and scalar counters.
+    """
+    arrays = {"version": np.array(CHECKPOINT_VERSION)}
+    for group in ("critters", "food"):
+        for name, values in state[group].items():
+            arrays[f"{group}.{name}"] = values
+    arrays["rng_state"] = np.array(json.dumps(state["rng_state"]))
+    for name, value in state.items():
+        if name not in ("critters", "food", "rng_state"):
+            arrays[name] = np.array(value)
+
+    temporary = f"{path}.tmp"
+    with open(temporary, "wb") as checkpoint_file:
+        np.savez_compressed(checkpoint_file, **arrays)
+    os.replace(temporary, path)
+
+
+def read_checkpoint(path) -> dict:
+    """
+    Reads a checkpoint written by write_checkpoint.
+    @param path The path of the checkpoint file.
+    @return A state in the form that write_checkpoint takes, with scalars as Python values.
+    """
+    with np.load(path) as arrays:
+        if int(arrays["version"]) != CHECKPOINT_VERSION:
+            raise ValueError(f"{path} is not a version {CHECKPOINT_VERSION} checkpoint")
+        state = {"critters": {}, "food": {}}
+        for key in arrays.files:
+            group, _, name = key.partition(".")
+            if name:
+                state[group][name] = arrays[key]
+            elif key == "rng_state":
+                state[key] = json.loads(str(arrays[key]))
+            elif key != "version":
+                value = arrays[key]
+                state[key] = value.item() if value.ndim == 0 else value
+    return state
+
+
+class CheckpointWriter:
+    """
+    Writes checkpoints from a background thread, so that compressing and writing a
+    large world does not hold up the simulation. The state handed to save() must not
+    share any arrays with the running simulation.
+    """
+
+    def __init__(self, path, log):
+        """
+        Constructor for the CheckpointWriter class. The writer thread starts immediately.
+        @param path The path of the checkpoint file. Each checkpoint replaces the last.
+        @param log The logger to report written checkpoints and errors to.
+        """
+        self.path = path
+        self.log = log
+        # Only one checkpoint waits at a time; if the writer falls behind, the
+        # simulation waits rather than queueing up copies of the world.
+        self._queue = queue.Queue(maxsize=1)
+        self._thread = threading.Thread(target=self._run, name="checkpoint-writer", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            state = self._queue.get()
+            if state is None:
+                break
+            try:
+                write_checkpoint(self.path, state)
+                self.log.info(f"Checkpoint of tick {state['update_count']} written to {self.path}")
+            except OSError as error:
+                self.log.error(f"Could not write checkpoint {self.path}: {error}")
+
+    def save(self, state):
+        """
+        Queues a state to be written.
+        """
+        self._queue.put(state)
+
+    def close(self):
+        """
+        Waits for any queued checkpoint to be written and stops the writer thread.
+        """
+        self._queue.put(None)
+        self._thread.join()
@@ -1,276 +1,246 @@
 '''
-Global Configuration module for use by various application files. 
+Global Configuration module for use by various application files.
 '''
+import dataclasses
 import toml
-import random
 from loguru import logger
+from rng import rng
 
+
+def setting(section: str, key: str):
+    '''
+    Declares a Config field that is read from the given section and key of the config file.
+    '''
+    return dataclasses.field(metadata={'section': section, 'key': key})
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
 class Config:
     '''
     The Config class can be used globally to expose configuration parameters.
     All parameters are read only and may be changed in the config.toml file prior to execution.
+    The file is read, converted and validated once when the Config is loaded, so every
+    parameter is a plain attribute that is cheap to read on the simulation's hot paths.
     '''
-    def __init__(self):
-        '''
-        Constructor for the Config class.
-        Assumes there is a config.toml file in the same directory as this file.
-        '''
-        self._config = toml.load("config.toml")
-        logger.add("debug.log",
+    # Screen
+    screen_title: str = setting('screen', 'title')
+    screen_width: int = setting('screen', 'width')
+    screen_height: int = setting('screen', 'height')
+    screen_back_colour: tuple = setting('screen', 'back_colour')
+    spawn_buffer_size: int = setting('screen', 'spawn_buffer')  # Margin where spawns are not allowed.
+    sidebar_width: int = setting('screen', 'sidebar_width')
+    sidebar_colour: tuple = setting('screen', 'sidebar_colour')
+    sidebar_opacity: int = setting('screen', 'sidebar_opacity')
+
+    # Simulation
+    simulation_headless: bool = setting('simulation', 'headless')  # Run without a window or frame cap.
+    simulation_engine: str = setting('simulation', 'engine')  # Either "sprite" or "numpy".
+    simulation_seed: int = setting('simulation', 'seed')  # A negative seed picks one at random.
+    simulation_event_log: str = setting('simulation', 'event_log')  # Empty for no event log.
+    simulation_max_ticks: int = setting('simulation', 'max_ticks')  # 0 runs indefinitely.
+    simulation_report_interval: int = setting('simulation', 'report_interval')
+    simulation_frame_rate: int = setting('simulation', 'frame_rate')
+    simulation_workers: int = setting('simulation', 'workers')  # 0 runs in a single process.
+    simulation_pool_size: int = setting('simulation', 'pool_size')  # Dead sprites kept for reuse.
+    simulation_checkpoint: str = setting('simulation', 'checkpoint')  # Empty for no checkpoints.
+    simulation_checkpoint_interval: int = setting('simulation', 'checkpoint_interval')
+    simulation_toroidal: bool = setting('simulation', 'toroidal')  # Edges wrap instead of reflecting.
+
+    # Rendering
+    render_mode: str = setting('render', 'mode')  # Either "full" or "dirty".
+    render_surface_cache_size: int = setting('render', 'surface_cache_size')
+    render_colour_levels: int = setting('render', 'colour_levels')  # Per colour channel.
+    render_window_width: int = setting('render', 'window_width')  # The camera's window.
+    render_window_height: int = setting('render', 'window_height')
+    render_heatmap_zoom: float = setting('render', 'heatmap_zoom')
+    render_heatmap_cell: int = setting('render', 'heatmap_cell')  # In window pixels.
+    render_pipeline: bool = setting('render', 'pipeline')  # Simulate and draw on separate threads.
+
+    # Metrics
+    metrics_file: str = setting('metrics', 'file')  # Empty for no metrics.
+    metrics_interval: int = setting('metrics', 'interval')  # In updates.
+    metrics_buffer_size: int = setting('metrics', 'buffer_size')
+    metrics_batch_size: int = setting('metrics', 'batch_size')
+    metrics_energy_bins: int = setting('metrics', 'energy_bins')
+
+    # Lineage
+    lineage_file: str = setting('lineage', 'file')  # Empty for no lineage.
+    lineage_gene_bins: int = setting('lineage', 'gene_bins')
+    lineage_history_interval: int = setting('lineage', 'history_interval')  # In updates.
+
+    # Profiling
+    profile_enabled: bool = setting('profile', 'enabled')
+    profile_panel: bool = setting('profile', 'panel')
+    profile_trace_frames: int = setting('profile', 'trace_frames')
+
+    # Logging
+    logging_level: str = setting('loguru', 'level')
+
+    # Critters
+    critter_has_random_size: bool = setting('critter', 'random_size')
+    critter_min_size: int = setting('critter', 'min_size')
+    critter_max_size: int = setting('critter', 'max_size')
+    critter_fixed_size: int = setting('critter', 'fixed_size')
+    critter_initial_count: int = setting('critter', 'initial_count')
+    critter_min_speed: int = setting('critter', 'min_speed')  # The speed of the largest critter.
+    critter_max_speed: int = setting('critter', 'max_speed')  # The speed of the smallest critter.
+    critter_min_energy: float = setting('critter', 'min_energy')
+    critter_max_energy: float = setting('critter', 'max_energy')
+    critter_energy_scale: float = setting('critter', 'energy_scale')
+    critter_max_age: float = setting('critter', 'old_age_threshold')
+    critter_can_die_of_old_age: bool = setting('critter', 'old_age_active')
+    critter_min_mating_energy: int = setting('critter', 'energy_to_mate')
+    critter_mating_cooldown: int = setting('critter', 'mating_cooldown')  # In updates.
+    critter_min_mating_age: int = setting('critter', 'min_mating_age')
+    critter_max_mating_age: int = setting('critter', 'max_mating_age')
+    critter_mating_distance: int = setting('critter', 'critter_mating_distance')
+    critter_mating_energy_cost: float = setting('critter', 'mating_energy_cost')
+    critter_mutation_rate: float = setting('critter', 'mutation_rate')
+    critter_mutation_scale: float = setting('critter', 'mutation_scale')
+    critter_max_population: int = setting('critter', 'max_population')
+    critter_movement: str = setting('critter', 'movement')
+    critter_sensing_radius: float = setting('critter', 'sensing_radius')
+    critter_wander_rate: float = setting('critter', 'wander_rate')  # Radians per update.
+    critter_steering_rate: float = setting('critter', 'steering_rate')  # Radians per update.
+
+    # Food
+    food_has_random_size: bool = setting('food', 'random_size')
+    food_min_size: int = setting('food', 'min_size')
+    food_max_size: int = setting('food', 'max_size')
+    food_fixed_size: int = setting('food', 'fixed_size')
+    food_initial_count: int = setting('food', 'initial_count')
+    food_energy_scale: float = setting('food', 'energy_scale')
+    food_respawn_interval: int = setting('food', 'respawn_interval')  # In updates.
+    food_respawn_count: int = setting('food', 'respawn_count')
+    food_patch_columns: int = setting('food', 'patch_columns')
+    food_patch_rows: int = setting('food', 'patch_rows')
+    food_patch_capacity: int = setting('food', 'patch_capacity')  # Items per patch.
+    food_fertility_spread: float = setting('food', 'fertility_spread')
+
+    @classmethod
+    def from_dict(cls, values: dict) -> 'Config':
+        '''
+        Creates a Config from the nested sections of a parsed config file, converting
+        each value to the type of its field and validating the result.
+        @param values The parsed config file.
+        '''
+        kwargs = {}
+        for field in dataclasses.fields(cls):
+            section, key = field.metadata['section'], field.metadata['key']
+            try:
+                raw = values[section][key]
+            except KeyError:
+                raise ValueError(f"Missing config setting [{section}] {key}") from None
+            kwargs[field.name] = field.type(raw)
+        instance = cls(**kwargs)
+        instance.validate()
+        return instance
+
+    @classmethod
+    def load(cls, path: str = "config.toml", overrides=None) -> 'Config':
+        '''
+        Loads the config file. Nothing else happens, so any process can import the config
+        cheaply; logging to a file is set up separately by attach_log_file.
+        @param path The path of the config file.
+        @param overrides A dict of values that replace those in the file, keyed by
+        "section.key", such as {"critter.energy_scale": 0.001}.
+        '''
+        values = toml.load(path)
+        for name, value in (overrides or {}).items():
+            section, _, key = name.partition('.')
+            if key not in values.get(section, {}):
+                raise ValueError(f"Unknown config setting {name}")
+            values[section][key] = value
+        return cls.from_dict(values)
+
+    def attach_log_file(self, path: str = "debug.log"):
+        '''
+        Attaches the debug log file sink at the configured logging level. The sink is
+        enqueued, so messages are written to the file by a background thread and logging
+        never waits for the disk.
+        @param path The path of the log file.
+        '''
+        logger.add(path,
                    format="{time:DD/MM/YYYY HH:mm:ss} {level} {function} {line} {message}",
                    rotation="50 MB",
-                   level=self.logging_level)
-        self._logger = logger
-
-
-    @property
-    def sidebar_width(self) -> int:
-        '''
-        Read-only: Returns the width of the sidebar from the application config file.
-        '''
-        return int(self._config['screen']['sidebar_width'])
-
-    @property
-    def sidebar_opacity(self) -> int:
-        '''
-        Read-only: Returns the width of the sidebar from the application config file.
-        '''
-        return int(self._config['screen']['sidebar_opacity'])
-
-    @property
-    def sidebar_colour(self) -> tuple:
-        '''
-        Read-only: Returns the opacity for the sidebar.
-        '''
-        return tuple(self._config['screen']['sidebar_colour'])
-
+                   level=self.logging_level,
+                   enqueue=True)
+
+    def validate(self):
+        '''
+        Raises a ValueError if any parameter is out of range.
+        '''
+        if self.screen_width <= 0 or self.screen_height <= 0:
+            raise ValueError("The screen width and height must be positive")
+        if not 0 <= self.sidebar_opacity <= 255:
+            raise ValueError("The sidebar opacity must be between 0 and 255")
+        if self.simulation_engine not in ("sprite", "numpy"):
+            raise ValueError('The simulation engine must be "sprite" or "numpy"')
+        for name, low, high in (
+            ("critter size", self.critter_min_size, self.critter_max_size),
+            ("critter speed", self.critter_min_speed, self.critter_max_speed),
+            ("critter energy", self.critter_min_energy, self.critter_max_energy),
+            ("critter mating age", self.critter_min_mating_age, self.critter_max_mating_age),
+            ("food size", self.food_min_size, self.food_max_size),
+        ):
+            if low > high:
+                raise ValueError(f"The minimum {name} must not exceed the maximum")
+        if min(self.critter_min_size, self.critter_fixed_size, self.food_min_size,
+               self.food_fixed_size) <= 0:
+            raise ValueError("Critter and food sizes must be positive")
+        if self.critter_initial_count < 0 or self.food_initial_count < 0:
+            raise ValueError("Initial critter and food counts must not be negative")
+        if self.render_mode not in ("full", "dirty", "camera"):
+            raise ValueError('The render mode must be "full", "dirty" or "camera"')
+        if min(self.render_window_width, self.render_window_height, self.render_heatmap_cell) <= 0:
+            raise ValueError("The camera window size and heatmap cell must be positive")
+        if self.render_surface_cache_size <= 0 or not 1 <= self.render_colour_levels <= 256:
+            raise ValueError("The surface cache size and colour levels must be positive")
+        if not 0.0 <= self.critter_mutation_rate <= 1.0:
+            raise ValueError("The critter mutation rate must be between 0 and 1")
+        if self.critter_movement not in ("simple", "random", "towards"):
+            raise ValueError('The critter movement must be "simple", "random" or "towards"')
+        if min(self.critter_sensing_radius, self.critter_wander_rate, self.critter_steering_rate) < 0:
+            raise ValueError("The sensing radius, wander and steering rates must not be negative")
+        if self.critter_mating_energy_cost < 0 or self.critter_max_population < 0:
+            raise ValueError("The mating energy cost and population cap must not be negative")
+        if self.simulation_workers < 0 or self.simulation_pool_size < 0:
+            raise ValueError("The number of simulation workers and the pool size must not be negative")
+        if min(self.metrics_interval, self.metrics_buffer_size, self.metrics_batch_size,
+               self.metrics_energy_bins) <= 0:
+            raise ValueError("The metrics interval, buffer, batch size and bins must be positive")
+        if self.lineage_gene_bins <= 0 or self.lineage_history_interval <= 0:
+            raise ValueError("The lineage gene bins and history interval must be positive")
+        if max(self.food_max_size, self.food_fixed_size) > self.critter_max_size:
+            # Collision grids are sized by the largest critter.
+            raise ValueError("Food must not be larger than the maximum critter size")
+        if self.food_patch_columns <= 0 or self.food_patch_rows <= 0 or self.food_patch_capacity < 0:
+            raise ValueError("Food needs at least one patch, and patch capacity must not be negative")
+        if not 0.0 <= self.food_fertility_spread <= 1.0:
+            raise ValueError("The food fertility spread must be between 0 and 1")
+        if self.food_respawn_interval <= 0:
+            raise ValueError("The food respawn interval must be at least one update")
 
     @property
     def logger(self):
         '''
         Read-only: Returns a logger object.
         '''
-        return self._logger
+        return logger
 
-    @property
-    def screen_width(self) -> int:
-        '''
-        Read-only: Returns the screen width from the application config file.
-        '''
-        return int(self._config['screen']['width'])
-
-    @property
-    def spawn_buffer_size(self) -> int:
-        '''
-        Read-only: Returns the spawn buffer size.
-        '''
-        return int(self._config['screen']['spawn_buffer'])
-
-    @property
-    def screen_height(self) -> int:
-        '''
-        Read-only: Returns the screen height from the application config file.
-        '''
-        return int(self._config['screen']['height'])
-
-    @property
-    def screen_title(self) -> str:
-        '''
-        Read-only: Returns the screen title from the application config file.
+    def sample_critter_size(self) -> int:
         '''
-        return str(self._config['screen']['title'])
-
-    @property
-    def screen_back_colour(self) -> tuple:
-        '''
-        Read-only: Returns the default background colour for the screen.
-        '''
-        return tuple(self._config['screen']['back_colour'])
-
-    @property
-    def logging_level(self) -> str:
-        '''
-        Read-only: Returns the logging level that loguru will use.
-        '''
-        return str(self._config['loguru']['level'])
-
-    @property
-    def critter_fixed_size(self) -> int:
-        '''
-        Read-only: Returns the fixed size of a critter.
-        '''
-        return int(self._config['critter']['fixed_size'])
-
-    @property
-    def critter_initial_count(self) -> int:
-        '''
-        Read-only: Returns the initial number of critters.
-        '''
-        return int(self._config['critter']['initial_count'])
-
-    @property
-    def critter_min_mating_energy(self) -> int:
-        '''
-        Read-only: Returns the minimum energy required to mate.
-        '''
-        return int(self._config['critter']['energy_to_mate'])
-
-    @property
-    def critter_mating_cooldown(self) -> int:
-        '''
-        Read-only: Returns the cycles that must pass before a critter can mate again.
-        '''
-        return int(self._config['critter']['mating_cooldown'])
-
-    @property
-    def critter_min_mating_age(self) -> int:
-        '''
-        Read-only: A critter's minimum mating age.
-        '''
-        return int(self._config['critter']['min_mating_age'])
-
-    @property
-    def critter_max_mating_age(self) -> int:
-        '''
-        Read-only: A critter's maximum mating age.
-        '''
-        return int(self._config['critter']['max_mating_age'])
-
-    @property
-    def critter_mating_distance(self) -> int:
-        '''
-        Read-only: Maximum distance from which critters can mate.
-        '''
-        return int(self._config['critter']['critter_mating_distance'])
-
-    @property
-    def critter_min_energy(self) -> float:
-        '''
-        Read-only: Returns the default speed of a critter.
-        '''
-        return float(self._config['critter']['min_energy'])
-
-    @property
-    def critter_max_energy(self) -> float:
-        '''
-        Read-only: Returns the default speed of a critter.
-        '''
-        return float(self._config['critter']['max_energy'])
-
-    @property
-    def critter_energy(self) -> float:
-        '''
-        Read-only: Returns an initial energy for a critter.
-        '''
-        return random.uniform(self._config['critter']['min_energy'], self._config['critter']['max_energy'])
-
-    @property
-    def critter_has_random_size(self) -> bool:
-        '''
-        Read-only: Returns a flag that determines if critters are given a random size.
-        '''
-        return bool(self._config['critter']['random_size'])
-
-    @property
-    def critter_can_die_of_old_age(self) -> bool:
-        '''
-        Read-only: If True critters can die of old age, if false they cannot.
-        '''
-        return bool(self._config['critter']['old_age_active'])
-
-    @property
-    def critter_min_size(self) -> int:
-        '''
-        Read-only: Returns the minimum initial size of a critter.
-        '''
-        return int(self._config['critter']['min_size'])
-
-    @property
-    def critter_max_age(self) -> float:
-        '''
-        Read-only: Returns the maximum age of a critter.
-        '''
-        return float(self._config['critter']['old_age_threshold'])
-
-    @property
-    def critter_max_size(self) -> int:
-        '''
-        Read-only: Returns the maximum initial size of a critter.
-        '''
-        return int(self._config['critter']['max_size'])
-
-    @property
-    def critter_size(self) -> int:
-        '''
-        Read-only: Returns an initial size for a critter.
+        Returns an initial size for a critter, drawn at random if critters are randomly sized.
         '''
         if self.critter_has_random_size:
-            return int(random.uniform(self._config['critter']['min_size'], 
-                                      self._config['critter']['max_size']))
-        else:
-            return self.critter_fixed_size
-
-    @property
-    def critter_energy_scale(self) -> float:
-        '''
-        Read-only: Returns a scalar value for critter energy calculations.
-        '''
-        return float(self._config['critter']['energy_scale'])
-
-    @property
-    def critter_min_speed(self) -> int:
-        '''
-        Read-only: Returns the minimum speed for the largest critter.
-        '''
-        return int(self._config['critter']['min_speed'])
-
-    @property
-    def critter_max_speed(self) -> int:
-        '''
-        Read-only: Returns the maximum speed for the msallest critter.
-        '''
-        return int(self._config['critter']['max_speed'])
-
-    @property
-    def food_min_size(self) -> int:
-        '''
-        Read-only: Returns the minimum size of food.
-        '''
-        return int(self._config['food']['min_size'])
+            return int(rng.uniform(self.critter_min_size, self.critter_max_size))
+        return self.critter_fixed_size
 
-    @property
-    def food_initial_count(self) -> int:
+    def sample_critter_energy(self) -> float:
         '''
-        Read-only: Returns the initial amount of food.
+        Returns an initial energy for a critter, drawn at random.
         '''
-        return int(self._config['food']['initial_count'])
+        return rng.uniform(self.critter_min_energy, self.critter_max_energy)
 
-    @property
-    def food_max_size(self) -> int:
-        '''
-        Read-only: Returns the maximum size of food.
-        '''
-        return int(self._config['food']['max_size'])
-
-    @property
-    def food_energy_scale(self) -> float:
-        '''
-        Read-only: Returns an initial energy for a sprite.
-        '''
-        return float(self._config['food']['energy_scale'])
-
-    @property
-    def food_respawn_rate(self) -> int:
-        '''
-        Read-only: Returns the maximum speed for the msallest sprite.
-        '''
-        return int(self._config['food']['respawn_rate'])
-    
-    @property
-    def food_respawn_count(self) -> int:
-        '''
-        Read-only: Returns the maximum speed for the msallest sprite.
-        '''
-        return int(self._config['food']['respawn_count'])
 
-config = Config()
+config = Config.load()
@@ -2,11 +2,23 @@
 Sprite classes
 """
 
-import random
 import math
 import enum
+import time
+import numpy as np
 import pygame
 from config import config
+from event_log import events, Event, DeathCause
+from lineage import lineage, NO_PARENT
+from profiler import profiler
+from renderer import CRITTER_LAYER
+from reproduction import births, can_mate_at, crossover
+from rng import rng
+from sprite_pool import SpritePool
+from surface_cache import surface_cache
+from tick_counters import tick_counters
+
+GENE_NAMES = ("size", "speed", "energy")
 
 
 class UpdateMethod(enum.Enum):
@@ -19,19 +31,51 @@ class UpdateMethod(enum.Enum):
     TOWARDS = 3
 
 
-class CritterSprite(pygame.sprite.Sprite):
+class CritterSprite(pygame.sprite.DirtySprite):
     """
-    The CritterSprite class
+    The CritterSprite class. Critters that die are kept in a pool and reinitialised by
+    create() rather than allocating a new sprite. The critter's position is the floating
+    point top left corner held in x and y, so that motion is not truncated to whole
+    pixels; rect is only moved to it by sync_rects() when the critter is to be drawn.
     """
 
+    _layer = CRITTER_LAYER
+
     died_of_old_age = 0
     died_of_no_energy = 0
+    next_id = 1
+    pool = SpritePool(config.simulation_pool_size)
 
     def __init__(self, x, y, genes):
         """
         Constructor for the DefaultSprite class.
         """
         super().__init__()
+        self.dirty = 2  # Critters move on every update.
+        self.rect = pygame.Rect(0, 0, 0, 0)
+        self.log = config.logger
+        self.reset(x, y, genes)
+
+    @classmethod
+    def create(cls, x, y, genes, parents=(NO_PARENT, NO_PARENT)) -> "CritterSprite":
+        """
+        Returns a new critter centred on (x, y), reusing a dead one if there is one.
+        @param parents The ids of the critter's two parents, for its lineage.
+        """
+        critter = cls.pool.acquire()
+        if critter is None:
+            critter = cls(x, y, genes)
+        else:
+            critter.reset(x, y, genes)
+        lineage.record_birth(critter.id, parents, [genes[name] for name in GENE_NAMES])
+        return critter
+
+    def reset(self, x, y, genes):
+        """
+        Initialises the critter as a newborn centred on (x, y), in place.
+        """
+        self.id = CritterSprite.next_id
+        CritterSprite.next_id += 1
         self.age = 0
         self.dx = 0
         self.dy = 0
@@ -50,30 +94,136 @@ class CritterSprite(pygame.sprite.Sprite):
             config.critter_max_energy - config.critter_min_energy
         )
 
-        self.image = pygame.Surface((self.size, self.size))
-        self.image.fill([0, 255, 0])
-        self.rect = self.image.get_rect()
+        self.colour = (0, 255, 0)
+        self.image = surface_cache.get(int(self.size), self.colour)
+        self.rect.size = self.image.get_size()
         self.rect.center = (x, y)
-        self.log = config.logger
-        self.max_age = config.critter_max_age + random.randint(0, 1000)
+        self.x = float(self.rect.x)
+        self.y = float(self.rect.y)
+        self.max_age = config.critter_max_age + rng.randint(0, 1000)
 
-        self.angle = random.uniform(0, 2 * math.pi)
+        self.angle = rng.uniform(0, 2 * math.pi)
         self.initial_energy = self.energy
+        events.record(Event.CRITTER_SPAWNED, self.id, 0, x, y)
+
+    @staticmethod
+    def export_all(critters) -> dict:
+        """
+        Returns the state of the given critters as a dict of arrays, with the same names
+        and types as CritterEngine.FIELDS, so that either engine can be restored from it.
+        """
+        critters = list(critters)
+
+        def column(values, dtype):
+            return np.fromiter(values, dtype, len(critters))
+
+        return {
+            "x": column((critter.x for critter in critters), np.float64),
+            "y": column((critter.y for critter in critters), np.float64),
+            "angle": column((critter.angle for critter in critters), np.float64),
+            "speed": column((critter.speed for critter in critters), np.float64),
+            "size": column((critter.size for critter in critters), np.float64),
+            "energy": column((critter.energy for critter in critters), np.float64),
+            "initial_energy": column((critter.initial_energy for critter in critters), np.float64),
+            "max_age": column((critter.max_age for critter in critters), np.float64),
+            "ids": column((critter.id for critter in critters), np.int64),
+            "age": column((critter.age for critter in critters), np.int64),
+            "last_mating_time": column((critter.last_mating_time for critter in critters), np.int64),
+            "genes": np.array(
+                [[critter.genes[name] for name in GENE_NAMES] for critter in critters],
+                dtype=np.float64,
+            ).reshape(len(critters), len(GENE_NAMES)),
+            "red": column((critter.colour[0] for critter in critters), np.uint8),
+            "blue": column((critter.colour[2] for critter in critters), np.uint8),
+        }
+
+    @classmethod
+    def restore_all(cls, state) -> list:
+        """
+        Recreates critters from a dict of arrays returned by export_all. The attributes
+        are set directly, so no random values are drawn and no spawn events recorded.
+        """
+        critters = []
+        init = pygame.sprite.DirtySprite.__init__
+        logger = config.logger
+        columns = zip(
+            *(state[name].tolist() for name in (
+                "x", "y", "angle", "speed", "size", "energy", "initial_energy", "max_age",
+                "ids", "age", "last_mating_time", "genes", "red", "blue",
+            ))
+        )
+        for (x, y, angle, speed, size, energy, initial_energy, max_age, critter_id, age,
+             last_mating_time, genes, red, blue) in columns:
+            critter = cls.__new__(cls)
+            init(critter)
+            critter.dirty = 2
+            critter.log = logger
+            critter.id = critter_id
+            critter.x = x
+            critter.y = y
+            critter.age = age
+            critter.dx = 0
+            critter.dy = 0
+            critter.genes = dict(zip(GENE_NAMES, genes))
+            critter.died_from_old_age = False
+            critter.died_no_energy = False
+            critter.last_mating_time = last_mating_time
+            critter.size = size
+            critter.speed = speed
+            critter.energy = energy
+            critter.initial_energy = initial_energy
+            critter.max_age = max_age
+            critter.angle = angle
+            critter.colour = (red, 0, blue)
+            critter.image = surface_cache.get(int(size), critter.colour)
+            critter.rect = critter.image.get_rect(topleft=(int(x), int(y)))
+            critters.append(critter)
+        return critters
+
+    def kill(self):
+        """
+        Removes the critter from all groups and returns it to the pool (overrides base
+        function). A critter can be killed twice in one update, so it is only pooled once.
+        """
+        if self.alive():
+            super().kill()
+            CritterSprite.pool.release(self)
+
+    @staticmethod
+    def sync_rects(critters):
+        """
+        Moves each critter's rect to its position. This is only needed before drawing.
+        """
+        for critter in critters:
+            critter.rect.topleft = (int(critter.x), int(critter.y))
+
+    def centre(self) -> tuple:
+        """
+        Returns the whole pixel centre of the critter, where its rect would be centred.
+        """
+        return (int(self.x) + self.rect.width // 2, int(self.y) + self.rect.height // 2)
 
     def handle_edge_collision(self):
         """
-        Determines if a critter is at the edge of its environment. If it is, the critter's 
-        direction is changed. When a critter reaches a wall, it is reflected at the same 
-        angle as its angle of incidence.
+        Determines if a critter is at the edge of its environment. In a toroidal world
+        a critter that leaves by one edge comes back at the opposite one. Otherwise a
+        critter that reaches a wall is put back on it and reflected at the same angle as
+        its angle of incidence, but only while it is heading out, so that it is reflected
+        once and cannot stick to the wall.
         """
-        if self.rect.y <= (0 - self.size // 2) or self.rect.y >= (
-            config.screen_height - self.size // 2
-        ):
+        half = self.size // 2
+        if config.simulation_toroidal:
+            self.x = (self.x + half) % config.screen_width - half
+            self.y = (self.y + half) % config.screen_height - half
+            return
+        high = config.screen_height - half
+        if (self.y <= -half and self.dy < 0) or (self.y >= high and self.dy > 0):
             self.angle = -self.angle
-        if self.rect.x <= (0 - self.size // 2) or self.rect.x >= (
-            config.screen_width - self.size // 2
-        ):
+        self.y = min(max(self.y, -half), high)
+        high = config.screen_width - half
+        if (self.x <= -half and self.dx < 0) or (self.x >= high and self.dx > 0):
             self.angle = math.pi - self.angle
+        self.x = min(max(self.x, -half), high)
 
     def simple_update(self):
         """
@@ -81,8 +231,54 @@ class CritterSprite(pygame.sprite.Sprite):
         """
         self.dx = self.speed * math.cos(self.angle)
         self.dy = self.speed * math.sin(self.angle)
-        self.rect.x += self.dx
-        self.rect.y += self.dy
+        self.x += self.dx
+        self.y += self.dy
+
+    def random_update(self):
+        """
+        A correlated random walk: the critter's heading drifts by a small random turn on
+        every update, so it wanders instead of travelling in a straight line.
+        """
+        self.angle += rng.gauss(0.0, config.critter_wander_rate)
+        self.simple_update()
+
+    def towards_update(self, food_grid):
+        """
+        Steers towards the nearest food within the sensing radius, turning by at most the
+        steering rate on each update. A critter that senses no food wanders as it does in
+        random_update.
+        @param food_grid A SpatialGrid of all food, rebuilt once per update.
+        """
+        target = self.nearest_food(food_grid)
+        if target is None:
+            self.random_update()
+            return
+        x, y = self.centre()
+        target_x, target_y = target.rect.center
+        # The turn that faces the food, wrapped to between -pi and pi.
+        turn = (math.atan2(target_y - y, target_x - x) - self.angle + math.pi) % (2 * math.pi) - math.pi
+        limit = config.critter_steering_rate
+        self.angle += max(-limit, min(turn, limit))
+        self.simple_update()
+
+    def nearest_food(self, food_grid):
+        """
+        Returns the living food nearest to the critter's centre within the sensing
+        radius, or None.
+        @param food_grid A SpatialGrid of all food, with cells at least as large as the
+        sensing radius plus the largest critter, so that the 3x3 block of cells around
+        the critter holds every item in range.
+        """
+        x, y = self.centre()
+        nearest = None
+        nearest_distance = config.critter_sensing_radius ** 2
+        for food in food_grid.nearby(self.x, self.y):
+            food_x, food_y = food.rect.center
+            distance = (food_x - x) ** 2 + (food_y - y) ** 2
+            if distance <= nearest_distance and food.alive():
+                nearest = food
+                nearest_distance = distance
+        return nearest
 
     def get_colour(self):
         """
@@ -104,7 +300,7 @@ class CritterSprite(pygame.sprite.Sprite):
         # Adjust the rate to make smaller critters lose energy at a balanced rate
         rate = self.speed * self.size * config.critter_energy_scale
         size_factor = (
-            config.critter_size / self.size
+            config.sample_critter_size() / self.size
         ) ** 0.5  # Use square root to reduce the impact
         self.energy -= rate * size_factor
 
@@ -112,58 +308,155 @@ class CritterSprite(pygame.sprite.Sprite):
         """
         Checks for collision with food and increases energy accordingly.
         @param self A reference to this class.
-        @param food_sprites The group of all existing food sprites.
+        @param food_sprites The SpatialGroup of all existing food sprites.
         """
-        collided_food = pygame.sprite.spritecollideany(self, food_sprites)
+        collided_food = food_sprites.collide_any(
+            (int(self.x), int(self.y), self.rect.width, self.rect.height)
+        )
         if collided_food:
             energy_gain = collided_food.get_energy_value()
             self.energy = min(self.energy + energy_gain, config.critter_max_energy)
+            events.record(Event.FOOD_EATEN, collided_food.id, self.id, *collided_food.rect.center)
             collided_food.kill()
 
-    def identify_mates(self, critters, current_update):
-        if (current_update - self.last_mating_time) >= config.critter_mating_cooldown:
-            if self.energy > config.critter_min_mating_energy:
-                for other_critter in critters:
-                    if other_critter != self:
-                        if other_critter.energy > config.critter_min_mating_energy:
-                            distance = math.dist((self.rect.x, self.rect.y), (other_critter.rect.x, other_critter.rect.y))
-                            if distance <= config.critter_mating_distance:
-                                # Mating can occur!
-                                self.log.debug("Mating is taking place!")
-                                self.last_mating_time = current_update
-                                other_critter.last_mating_time = current_update
-                                break
+    def identify_mates(self, mating_grid, current_update):
+        """
+        Looks for a partner within mating distance of this critter.
+        @param self A reference to this class.
+        @param mating_grid A SpatialGrid of all critters, rebuilt once per update.
+        @param current_update The number of updates that have taken place so far.
+        """
+        if self.ready_to_mate(current_update):
+            for other_critter in mating_grid.nearby(self.x, self.y):
+                if other_critter != self and other_critter.alive():
+                    if other_critter.ready_to_mate(current_update):
+                        distance = math.dist((self.x, self.y), (other_critter.x, other_critter.y))
+                        if distance <= config.critter_mating_distance:
+                            # Mating can occur!
+                            self.mate_with(other_critter, current_update)
+                            break
 
+    def ready_to_mate(self, current_update) -> bool:
+        """
+        Returns True if the critter is of mating age, has enough energy and has not
+        mated too recently.
+        @param current_update The number of updates that have taken place so far.
+        """
+        return (
+            (current_update - self.last_mating_time) >= config.critter_mating_cooldown
+            and self.energy > config.critter_min_mating_energy
+            and can_mate_at(self.age)
+        )
 
-    def update(self, method: UpdateMethod, food_sprites, critters, update_count):
+    def mate_with(self, other_critter, current_update):
         """
-        Updates a sprite before redrawing (overrides base function).
+        Mates with another critter. Both parents pay the energy cost of mating, and a
+        child with genes from both is queued to be born between them at the end of the
+        update.
+        @param other_critter The critter's partner.
+        @param current_update The number of updates that have taken place so far.
+        """
+        tick_counters.count("matings")
+        events.record(Event.CRITTERS_MATED, self.id, other_critter.id, *self.centre())
+        for parent in (self, other_critter):
+            parent.last_mating_time = current_update
+            parent.energy -= config.critter_mating_energy_cost
+        (x, y), (other_x, other_y) = self.centre(), other_critter.centre()
+        births.add((x + other_x) // 2, (y + other_y) // 2, crossover(self.genes, other_critter.genes),
+                   (self.id, other_critter.id))
+
+
+    def move(self, method: UpdateMethod, food_grid=None):
+        """
+        Moves the critter using the given update method.
+        @param food_grid A SpatialGrid of all food, needed by UpdateMethod.TOWARDS.
         """
         match method:
             case UpdateMethod.SIMPLE:
                 self.simple_update()
+            case UpdateMethod.RANDOM:
+                self.random_update()
+            case UpdateMethod.TOWARDS:
+                self.towards_update(food_grid)
 
-        self.deplete_energy()
-        self.handle_edge_collision()
-        self.check_food_collision(food_sprites)
-
-        self.identify_mates(critters, update_count)
-
+    def age_and_die(self):
+        """
+        Ages the critter by one update and kills it if it is too old or out of energy.
+        """
         self.age += 1
 
         if config.critter_can_die_of_old_age:
             if self.age >= self.max_age:
                 self.died_from_old_age = True
                 CritterSprite.died_of_old_age += 1
+                events.record(Event.CRITTER_DIED, self.id, DeathCause.OLD_AGE, *self.centre())
+                lineage.record_death(self.id)
                 self.kill()
 
         if self.energy < 0.0:
             self.died_no_energy = True
             CritterSprite.died_of_no_energy += 1
+            if not self.died_from_old_age:
+                events.record(Event.CRITTER_DIED, self.id, DeathCause.NO_ENERGY, *self.centre())
+                lineage.record_death(self.id)
             self.kill()
 
-        c = self.get_colour()
-        self.image.fill(c)  # Ensure energy_percent is not negative
+    def recolour(self):
+        """
+        Updates the critter's image to match its remaining energy.
+        """
+        # Sprites share their image with every other sprite of the same size and colour,
+        # so the image is swapped rather than filled, and only when the colour changes.
+        colour = surface_cache.quantise(self.get_colour())
+        if colour != self.colour:
+            self.colour = colour
+            self.image = surface_cache.get(self.rect.width, colour)
+
+    def update(self, method: UpdateMethod, food_sprites, mating_grid, update_count, food_grid=None):
+        """
+        Updates a sprite before redrawing (overrides base function).
+        @param food_grid A SpatialGrid of all food, needed by UpdateMethod.TOWARDS.
+        """
+        if profiler.enabled:
+            self.profiled_update(method, food_sprites, mating_grid, update_count, food_grid)
+            return
+
+        self.move(method, food_grid)
+        self.deplete_energy()
+        self.handle_edge_collision()
+        self.check_food_collision(food_sprites)
+        self.identify_mates(mating_grid, update_count)
+        self.age_and_die()
+        self.recolour()
+
+    def profiled_update(self, method: UpdateMethod, food_sprites, mating_grid, update_count,
+                        food_grid=None):
+        """
+        The same as update, but adds the time taken by each step to the profiler.
+        """
+        clock = time.perf_counter
+        add = profiler.add
+        start = clock()
+        self.move(method, food_grid)
+        end = clock()
+        add("movement", end - start)
+        self.deplete_energy()
+        start = clock()
+        add("energy", start - end)
+        self.handle_edge_collision()
+        end = clock()
+        add("edges", end - start)
+        self.check_food_collision(food_sprites)
+        start = clock()
+        add("food", start - end)
+        self.identify_mates(mating_grid, update_count)
+        end = clock()
+        add("mating", end - start)
+        self.age_and_die()
+        start = clock()
+        add("ageing", start - end)
+        self.recolour()
+        add("colour", clock() - start)
 
     def draw(self):
         """
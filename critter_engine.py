@@ -0,0 +1,711 @@
+"""
+A vectorised critter engine. Critter state is held in NumPy arrays (one array per
+attribute) and each update is applied to the whole population at once, rather than
+calling CritterSprite.update for every critter in turn.
+"""
+
+import math
+import numpy as np
+import pygame
+from config import config
+from creature_sprite import CritterSprite, GENE_NAMES, UpdateMethod
+from event_log import events, Event, DeathCause
+from lineage import lineage
+from profiler import profiler
+from renderer import CRITTER_LAYER
+from reproduction import crossover_arrays
+from rng import rng
+from surface_cache import surface_cache
+from tick_counters import tick_counters
+
+
+class CritterView(pygame.sprite.DirtySprite):
+    """
+    A thin sprite used to draw one critter held by a CritterEngine. Views hold no
+    simulation state of their own; the engine moves and recolours them when it syncs.
+    """
+
+    _layer = CRITTER_LAYER
+
+    def __init__(self, engine, index, size):
+        """
+        Constructor for the CritterView class.
+        @param engine The CritterEngine that owns the critter.
+        @param index The critter's index into the engine's arrays.
+        @param size The width and height of the critter.
+        """
+        super().__init__()
+        self.dirty = 2  # Critters move on every update.
+        self.engine = engine
+        self.index = index
+        self.size = size
+        self.colour = (0, 0, 255)
+        self.image = surface_cache.get(size, self.colour)
+        self.rect = self.image.get_rect()
+
+
+def neighbour_pairs(ax, ay, bx, by, cell_size):
+    """
+    Returns the index pairs (i, j) for which point j of the b set lies in the 3x3 block of
+    grid cells around point i of the a set. The pairs are sorted by i and then by j.
+    Callers apply their own exact distance or overlap test to the candidates.
+    @param ax, ay The coordinates of the a set.
+    @param bx, by The coordinates of the b set.
+    @param cell_size The width and height of each grid cell.
+    """
+    # The relationship is symmetric, so the smaller set is always used for the queries
+    # and the larger one is sorted and searched.
+    if len(ax) > len(bx):
+        j, i = _grid_pairs(bx, by, ax, ay, cell_size)
+    else:
+        i, j = _grid_pairs(ax, ay, bx, by, cell_size)
+    sort = np.lexsort((j, i))
+    return i[sort], j[sort]
+
+
+def _grid_pairs(ax, ay, bx, by, cell_size):
+    """
+    Returns the unsorted candidate pairs for neighbour_pairs, searching a sorted table of
+    the b set's cells once for each of the nine cells around each point of the a set.
+    """
+    empty = np.empty(0, dtype=np.int64)
+    if len(ax) == 0 or len(bx) == 0:
+        return empty, empty
+
+    # Cell coordinates are packed into one int64 key, offset so that negative cells
+    # (critters just past the edge of the world) still sort correctly.
+    offset = 1 << 20
+    span = 1 << 21
+    acx = np.floor_divide(ax, cell_size).astype(np.int64) + offset
+    acy = np.floor_divide(ay, cell_size).astype(np.int64) + offset
+    bkey = (np.floor_divide(bx, cell_size).astype(np.int64) + offset) * span + (
+        np.floor_divide(by, cell_size).astype(np.int64) + offset
+    )
+    order = np.argsort(bkey, kind="stable")
+    sorted_keys = bkey[order]
+
+    pairs_i = []
+    pairs_j = []
+    for ox in (-1, 0, 1):
+        for oy in (-1, 0, 1):
+            keys = (acx + ox) * span + (acy + oy)
+            lo = np.searchsorted(sorted_keys, keys, side="left")
+            hi = np.searchsorted(sorted_keys, keys, side="right")
+            counts = hi - lo
+            total = int(counts.sum())
+            if total == 0:
+                continue
+            i = np.repeat(np.arange(len(ax)), counts)
+            starts = np.repeat(lo - (np.cumsum(counts) - counts), counts)
+            pairs_i.append(i)
+            pairs_j.append(order[starts + np.arange(total)])
+
+    if not pairs_i:
+        return empty, empty
+    return np.concatenate(pairs_i), np.concatenate(pairs_j)
+
+
+def nearest_within(ax, ay, bx, by, radius):
+    """
+    Returns, for each point of the a set, the index of the nearest point of the b set no
+    more than radius away, or -1 if there is none. Ties go to the lower index.
+    @param ax, ay The coordinates of the a set.
+    @param bx, by The coordinates of the b set.
+    @param radius The largest distance to search.
+    """
+    nearest = np.full(len(ax), -1, dtype=np.int64)
+    i, j = neighbour_pairs(ax, ay, bx, by, max(1, radius))
+    distance = (bx[j] - ax[i]) ** 2 + (by[j] - ay[i]) ** 2
+    keep = distance <= radius * radius
+    i, j, distance = i[keep], j[keep], distance[keep]
+    order = np.lexsort((j, distance, i))
+    i, j = i[order], j[order]
+    first = np.ones(len(i), dtype=bool)
+    first[1:] = i[1:] != i[:-1]
+    nearest[i[first]] = j[first]
+    return nearest
+
+
+class SpriteFood:
+    """
+    Presents a group of food sprites to a CritterEngine as arrays. The arrays are taken
+    once, when the wrapper is created, so a new wrapper is needed for every update.
+    """
+
+    def __init__(self, food_group):
+        """
+        Constructor for the SpriteFood class.
+        @param food_group The group of all existing food sprites.
+        """
+        self.sprites = food_group.sprites()
+        count = len(self.sprites)
+        self.x = np.fromiter((food.rect.x for food in self.sprites), np.float64, count)
+        self.y = np.fromiter((food.rect.y for food in self.sprites), np.float64, count)
+        self.size = np.fromiter((food.rect.w for food in self.sprites), np.float64, count)
+        self.ids = np.fromiter((food.id for food in self.sprites), np.int64, count)
+
+    def energy_value(self, index) -> float:
+        """
+        Returns the energy gained by eating the food at index.
+        """
+        return self.sprites[index].get_energy_value()
+
+    def consume(self, indices):
+        """
+        Removes the eaten food at the given indices by killing its sprites.
+        """
+        for index in indices:
+            self.sprites[index].kill()
+
+
+class FoodArrays:
+    """
+    Food held only as arrays, for engines that run without any sprites. Positions are
+    the top left corner of each square item of food.
+    """
+
+    def __init__(self):
+        """
+        Constructor for the FoodArrays class.
+        """
+        self.x = np.empty(0, dtype=np.float64)
+        self.y = np.empty(0, dtype=np.float64)
+        self.size = np.empty(0, dtype=np.float64)
+        self.ids = np.empty(0, dtype=np.int64)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def add(self, x, y, size, ids):
+        """
+        Adds items of food.
+        @param x, y The top left corner of each item.
+        @param size The width and height of each item.
+        @param ids The id of each item.
+        """
+        self.x = np.concatenate((self.x, x))
+        self.y = np.concatenate((self.y, y))
+        self.size = np.concatenate((self.size, size))
+        self.ids = np.concatenate((self.ids, ids))
+
+    def energy_value(self, index) -> float:
+        """
+        Returns the energy gained by eating the food at index, as FoodSprite does.
+        """
+        return float(self.size[index]) ** 2 * config.food_energy_scale
+
+    def consume(self, indices):
+        """
+        Removes the eaten food at the given indices.
+        """
+        keep = np.ones(len(self.ids), dtype=bool)
+        keep[list(indices)] = False
+        self.x = self.x[keep]
+        self.y = self.y[keep]
+        self.size = self.size[keep]
+        self.ids = self.ids[keep]
+
+
+class CritterEngine:
+    """
+    Holds every critter as a structure of arrays. Positions are the floating point top
+    left corner of each critter, so motion is not truncated to whole pixels as it is
+    for a sprite rect. Rendering is done through CritterView sprites, which are only
+    created when the engine is given a group to add them to.
+    """
+
+    # The per-critter arrays, with their types and the shape of each critter's entry.
+    FIELDS = {
+        "x": (np.float64, ()),
+        "y": (np.float64, ()),
+        "angle": (np.float64, ()),
+        "speed": (np.float64, ()),
+        "size": (np.float64, ()),
+        "energy": (np.float64, ()),
+        "initial_energy": (np.float64, ()),
+        "max_age": (np.float64, ()),
+        "ids": (np.int64, ()),
+        "age": (np.int64, ()),
+        "last_mating_time": (np.int64, ()),
+        "genes": (np.float64, (len(GENE_NAMES),)),
+        "red": (np.uint8, ()),
+        "blue": (np.uint8, ()),
+    }
+
+    def __init__(self, view_groups=None, capacity=1024, id_start=1, id_step=1):
+        """
+        Constructor for the CritterEngine class.
+        @param view_groups The sprite groups that hold a CritterView for each critter, or
+        None to run without any sprites (for example when running headless).
+        @param capacity The number of critters to allocate space for initially.
+        @param id_start, id_step The first critter id and the gap between ids, so that
+        several engines can hand out ids without clashing.
+        """
+        self.count = 0
+        self.total_age = 0
+        self.capacity = 0
+        self.view_groups = view_groups
+        self.views = []
+        # Seeded from the simulation's generator so that a seeded run is reproducible.
+        self.rng = np.random.default_rng(rng.getrandbits(64))
+        self.next_id = id_start
+        self.id_step = id_step
+        # Births are held back until the end of an update, and dropped beyond this.
+        self.max_population = config.critter_max_population
+        self.movement = UpdateMethod[config.critter_movement.upper()]
+        self._births = []
+        # Critters added by add() are in birth order, which makes the first the oldest.
+        # Critters imported from elsewhere may not be.
+        self.birth_ordered = True
+
+        self.x = self.y = self.angle = self.speed = self.size = None
+        self.energy = self.initial_energy = self.max_age = None
+        self.ids = self.age = self.last_mating_time = self.genes = None
+        self.red = self.blue = None
+        self._allocate(max(1, capacity))
+
+    def _allocate(self, capacity):
+        """
+        Resizes every array to hold capacity critters, keeping the existing critters.
+        """
+        for name, (dtype, shape) in self.FIELDS.items():
+            new = np.zeros((capacity,) + shape, dtype=dtype)
+            old = getattr(self, name)
+            if old is not None:
+                new[: self.count] = old[: self.count]
+            setattr(self, name, new)
+        self.capacity = capacity
+
+    @property
+    def average_age(self) -> int:
+        """
+        Read-only: Returns the average age of the living critters, rounded down.
+        """
+        return self.total_age // self.count if self.count else 0
+
+    @property
+    def oldest_age(self) -> int:
+        """
+        Read-only: Returns the age of the oldest living critter. Critters are appended
+        as they are born and removal keeps their order, so the first is the oldest
+        unless critters have been imported.
+        """
+        if not self.count:
+            return 0
+        if self.birth_ordered:
+            return int(self.age[0])
+        return int(self.age[: self.count].max())
+
+    def add(self, x, y, genes):
+        """
+        Adds a critter centred on (x, y). Attributes are derived from the genes in the
+        same way as CritterSprite.
+        @param x, y The centre of the new critter.
+        @param genes A dict with a value between -1 and 1 for each of the GENE_NAMES.
+        """
+        self.add_many(np.array([x]), np.array([y]), np.array([[genes[name] for name in GENE_NAMES]]))
+
+    def add_many(self, x, y, genes, parents=None):
+        """
+        Adds several critters at once.
+        @param x, y Arrays of the centres of the new critters.
+        @param genes An array with one row of genes for each new critter, with a column
+        for each of the GENE_NAMES.
+        @param parents An array with the ids of each new critter's two parents, for
+        their lineage, or None if they were not born from a mating.
+        """
+        added = len(x)
+        if added == 0:
+            return
+        if self.count + added > self.capacity:
+            self._allocate(max(self.capacity * 2, self.count + added))
+
+        new = slice(self.count, self.count + added)
+        size_gene, speed_gene, energy_gene = genes.T
+        size = config.critter_min_size + (size_gene + 1) / 2 * (
+            config.critter_max_size - config.critter_min_size
+        )
+        width = size.astype(np.int64)
+
+        self.x[new] = x - width // 2
+        self.y[new] = y - width // 2
+        self.size[new] = size
+        self.speed[new] = config.critter_min_speed + (speed_gene + 1) / 2 * (
+            config.critter_max_speed - config.critter_min_speed
+        )
+        self.energy[new] = config.critter_min_energy + (energy_gene + 1) / 2 * (
+            config.critter_max_energy - config.critter_min_energy
+        )
+        self.initial_energy[new] = self.energy[new]
+        self.ids[new] = self.next_id + self.id_step * np.arange(added)
+        self.next_id += self.id_step * added
+        self.max_age[new] = config.critter_max_age + self.rng.integers(0, 1000, added, endpoint=True)
+        self.angle[new] = self.rng.uniform(0, 2 * math.pi, added)
+        self.age[new] = 0
+        self.last_mating_time[new] = 0
+        self.genes[new] = genes
+        self.red[new] = 0
+        self.blue[new] = 255
+        first = self.count
+        self.count += added
+        if events.enabled:
+            for i, (centre_x, centre_y) in enumerate(zip(x.tolist(), y.tolist()), first):
+                events.record(Event.CRITTER_SPAWNED, int(self.ids[i]), 0, centre_x, centre_y)
+        lineage.record_births(self.ids[new], parents, genes)
+
+        if self.view_groups is not None:
+            self._add_views(first)
+
+    def _add_views(self, first):
+        """
+        Creates a view in view_groups for every critter from index first onwards.
+        """
+        for i, width in enumerate(np.trunc(self.size[first: self.count]).astype(np.int64).tolist(), first):
+            view = CritterView(self, i, width)
+            self.views.append(view)
+            view.add(self.view_groups)
+
+    def attach_views(self, view_groups):
+        """
+        Starts keeping a CritterView for each critter, including those that already exist.
+        @param view_groups The sprite groups that hold the views.
+        """
+        self.view_groups = view_groups
+        self._add_views(len(self.views))
+
+    def export_state(self, indices) -> dict:
+        """
+        Returns a copy of the state of the critters at the given indices, as a dict of
+        arrays keyed by the names in FIELDS.
+        """
+        return {name: getattr(self, name)[: self.count][indices] for name in self.FIELDS}
+
+    def import_state(self, state):
+        """
+        Appends critters from a dict of arrays returned by export_state. Imported
+        critters have no views.
+        """
+        added = len(state["ids"])
+        if added == 0:
+            return
+        if self.count + added > self.capacity:
+            self._allocate(max(self.capacity * 2, self.count + added))
+        for name in self.FIELDS:
+            getattr(self, name)[self.count: self.count + added] = state[name]
+        self.count += added
+        self.total_age += int(state["age"].sum())
+        self.birth_ordered = False
+
+    def restore(self, state, next_id, birth_ordered):
+        """
+        Adds critters from a checkpoint, with views if the engine has view groups.
+        @param state A dict of arrays keyed by the names in FIELDS.
+        @param next_id The id to give the next critter that is born.
+        @param birth_ordered True if the critters are in the order they were born.
+        """
+        first = self.count
+        self.import_state(state)
+        self.next_id = next_id
+        self.birth_ordered = birth_ordered
+        if self.view_groups is not None:
+            self._add_views(first)
+
+    def step(self, food, update_count):
+        """
+        Advances every critter by one update. This applies the same rules as
+        CritterSprite.update: move, deplete energy, reflect off the edges, eat, mate,
+        age, die and recolour.
+        @param food The food to eat, as a SpriteFood or FoodArrays.
+        @param update_count The number of updates that have taken place so far.
+        """
+        if self.count == 0:
+            return
+        # Energy and edge collision are part of move() here, so they are timed as
+        # movement.
+        with profiler.phase("movement"):
+            self.steer(food)
+            self.move()
+        with profiler.phase("food"):
+            self.eat(food)
+        with profiler.phase("mating"):
+            self.mate(update_count)
+        with profiler.phase("ageing"):
+            self.age_and_die()
+            self.add_births()
+
+    def steer(self, food):
+        """
+        Turns every critter according to the movement method, as CritterSprite.move does:
+        critters that wander turn at random, and critters that seek food turn towards the
+        nearest item within the sensing radius, or wander if there is none. The food is
+        indexed once for the whole population rather than searched by each critter.
+        @param food The food to seek, as a SpriteFood or FoodArrays.
+        """
+        n = self.count
+        if self.movement is UpdateMethod.SIMPLE or n == 0:
+            return
+        angle = self.angle[:n]
+        turn = self.rng.normal(0.0, config.critter_wander_rate, n)
+        if self.movement is UpdateMethod.TOWARDS and len(food.ids):
+            half_width = np.trunc(self.size[:n]) // 2
+            centre_x = np.trunc(self.x[:n]) + half_width
+            centre_y = np.trunc(self.y[:n]) + half_width
+            food_half_width = food.size // 2
+            food_x = food.x + food_half_width
+            food_y = food.y + food_half_width
+            target = nearest_within(centre_x, centre_y, food_x, food_y,
+                                    config.critter_sensing_radius)
+            sensed = target >= 0
+            target = target[sensed]
+            heading = np.arctan2(food_y[target] - centre_y[sensed], food_x[target] - centre_x[sensed])
+            # The turn that faces the food, wrapped to between -pi and pi.
+            facing = (heading - angle[sensed] + math.pi) % (2 * math.pi) - math.pi
+            limit = config.critter_steering_rate
+            turn[sensed] = np.clip(facing, -limit, limit)
+        angle += turn
+
+    def move(self):
+        """
+        Moves every critter, depletes its energy and reflects it off the edges of the world.
+        """
+        n = self.count
+        x = self.x[:n]
+        y = self.y[:n]
+        angle = self.angle[:n]
+        speed = self.speed[:n]
+        size = self.size[:n]
+
+        # Movement
+        dx = speed * np.cos(angle)
+        dy = speed * np.sin(angle)
+        x += dx
+        y += dy
+
+        # Energy. CritterSprite samples a fresh reference size for every critter on
+        # every update, so the same is done here.
+        if config.critter_has_random_size:
+            reference_size = np.floor(
+                self.rng.uniform(config.critter_min_size, config.critter_max_size, n)
+            )
+        else:
+            reference_size = config.critter_fixed_size
+        self.energy[:n] -= speed * size * config.critter_energy_scale * np.sqrt(
+            reference_size / size
+        )
+
+        # Edge collision, as in CritterSprite.handle_edge_collision: wrap around a
+        # toroidal world, or reflect critters heading out through a wall once and put
+        # them back on it.
+        half = size // 2
+        if config.simulation_toroidal:
+            x[:] = np.mod(x + half, config.screen_width) - half
+            y[:] = np.mod(y + half, config.screen_height) - half
+            return
+        high = config.screen_height - half
+        flip_y = ((y <= -half) & (dy < 0)) | ((y >= high) & (dy > 0))
+        angle[flip_y] = -angle[flip_y]
+        np.clip(y, -half, high, out=y)
+        high = config.screen_width - half
+        flip_x = ((x <= -half) & (dx < 0)) | ((x >= high) & (dx > 0))
+        angle[flip_x] = math.pi - angle[flip_x]
+        np.clip(x, -half, high, out=x)
+
+    def age_and_die(self):
+        """
+        Ages every critter, removes those that died and recolours the survivors.
+        """
+        n = self.count
+        energy = self.energy[:n]
+        age = self.age[:n]
+        age += 1
+        self.total_age += n
+        dead_of_old_age = np.zeros(n, dtype=bool)
+        if config.critter_can_die_of_old_age:
+            dead_of_old_age = age >= self.max_age[:n]
+        dead_of_no_energy = energy < 0.0
+        CritterSprite.died_of_old_age += int(dead_of_old_age.sum())
+        CritterSprite.died_of_no_energy += int(dead_of_no_energy.sum())
+
+        # Colour, fading from blue to red as energy is used up.
+        energy_percent = np.maximum(energy / self.initial_energy[:n], 0)
+        self.red[:n] = np.clip((255 * (1 - energy_percent)).astype(np.int64), 0, 255)
+        self.blue[:n] = np.clip((255 * energy_percent).astype(np.int64), 0, 255)
+
+        dead = dead_of_old_age | dead_of_no_energy
+        if dead.any():
+            if events.enabled:
+                half_width = np.trunc(self.size[:n]) // 2
+                for i in np.flatnonzero(dead).tolist():
+                    cause = DeathCause.OLD_AGE if dead_of_old_age[i] else DeathCause.NO_ENERGY
+                    events.record(Event.CRITTER_DIED, int(self.ids[i]), cause,
+                                  float(self.x[i] + half_width[i]), float(self.y[i] + half_width[i]))
+            lineage.record_deaths(self.ids[:n][dead])
+            self.remove(dead)
+
+    def eat(self, food):
+        """
+        Lets each critter eat the first food item it overlaps, in the same order that
+        CritterSprite.check_food_collision would, and removes the food that was eaten.
+        @param food The food to eat, as a SpriteFood or FoodArrays.
+        """
+        if len(food.ids) == 0:
+            return
+
+        n = self.count
+        fx = food.x
+        fy = food.y
+        fw = food.size
+
+        # No critter or food is larger than the maximum critter size, so every
+        # overlapping pair shares a cell or neighbouring cells of that size.
+        cx = np.trunc(self.x[:n])
+        cy = np.trunc(self.y[:n])
+        width = np.trunc(self.size[:n])
+        i, j = neighbour_pairs(cx, cy, fx, fy, config.critter_max_size)
+        overlap = (
+            (cx[i] < fx[j] + fw[j])
+            & (fx[j] < cx[i] + width[i])
+            & (cy[i] < fy[j] + fw[j])
+            & (fy[j] < cy[i] + width[i])
+            & (width[i] > 0)
+            & (fw[j] > 0)
+        )
+        i = i[overlap]
+        j = j[overlap]
+        if len(i) == 0:
+            return
+
+        fed = set()
+        eaten = {}
+        energy = self.energy
+        for critter, item in zip(i.tolist(), j.tolist()):
+            if critter in fed or item in eaten:
+                continue
+            fed.add(critter)
+            eaten[item] = None
+            energy[critter] = min(
+                energy[critter] + food.energy_value(item), config.critter_max_energy
+            )
+            half_width = fw[item] // 2
+            events.record(Event.FOOD_EATEN, int(food.ids[item]), int(self.ids[critter]),
+                          float(fx[item] + half_width), float(fy[item] + half_width))
+        food.consume(list(eaten))
+
+    def mate(self, update_count, candidates=None, local=None):
+        """
+        Pairs up critters that are ready to mate and within mating distance of each
+        other. Each critter mates at most once, with pairs chosen in critter order.
+        @param update_count The number of updates that have taken place so far.
+        @param candidates Only the first candidates critters may mate (all by default).
+        @param local Pairs must include at least one of the first local critters (any
+        pair is allowed by default).
+        """
+        n = self.count if candidates is None else candidates
+        ready = np.flatnonzero(
+            ((update_count - self.last_mating_time[:n]) >= config.critter_mating_cooldown)
+            & (self.energy[:n] > config.critter_min_mating_energy)
+            & (self.age[:n] >= config.critter_min_mating_age)
+            & (self.age[:n] <= config.critter_max_mating_age)
+        )
+        if len(ready) < 2:
+            return
+
+        px = np.trunc(self.x[ready])
+        py = np.trunc(self.y[ready])
+        distance = config.critter_mating_distance
+        i, j = neighbour_pairs(px, py, px, py, max(1, distance))
+        keep = (i < j) & (np.hypot(px[i] - px[j], py[i] - py[j]) <= distance)
+        if local is not None:
+            # ready is sorted, so the first critter of a pair is the lower index.
+            keep &= ready[i] < local
+        i = i[keep]
+        j = j[keep]
+
+        mated = set()
+        pairs = []
+        for a, b in zip(i.tolist(), j.tolist()):
+            if a in mated or b in mated:
+                continue
+            mated.add(a)
+            mated.add(b)
+            pairs.append((a, b))
+            events.record(Event.CRITTERS_MATED, int(self.ids[ready[a]]), int(self.ids[ready[b]]),
+                          float(px[a]), float(py[a]))
+        if not pairs:
+            return
+
+        tick_counters.count("matings", len(pairs))
+        first, second = (ready[list(parents)] for parents in zip(*pairs))
+        parents = np.concatenate((first, second))
+        self.last_mating_time[parents] = update_count
+        self.energy[parents] -= config.critter_mating_energy_cost
+
+        # Children are born between their parents once the update has finished.
+        half_width = np.trunc(self.size) // 2
+        centre_x = (self.x[first] + half_width[first] + self.x[second] + half_width[second]) / 2
+        centre_y = (self.y[first] + half_width[first] + self.y[second] + half_width[second]) / 2
+        self._births.append(
+            (centre_x, centre_y, crossover_arrays(self.genes[first], self.genes[second], self.rng),
+             np.column_stack((self.ids[first], self.ids[second])))
+        )
+
+    def add_births(self):
+        """
+        Adds the children conceived since the last call, up to max_population critters.
+        """
+        if not self._births:
+            return
+        x, y, genes, parents = (np.concatenate(values) for values in zip(*self._births))
+        self._births = []
+        room = max(0, self.max_population - self.count)
+        if len(x) > room:
+            tick_counters.count("births dropped", len(x) - room)
+        self.add_many(x[:room], y[:room], genes[:room], parents[:room])
+
+    def remove(self, dead):
+        """
+        Removes critters by compacting every array, and kills their views.
+        @param dead A boolean mask over the current critters.
+        """
+        n = self.count
+        keep = ~dead
+        self.total_age -= int(self.age[:n][dead].sum())
+        remaining = int(keep.sum())
+        for name in self.FIELDS:
+            array = getattr(self, name)
+            array[:remaining] = array[:n][keep]
+        self.count = remaining
+
+        if self.views:
+            survivors = []
+            for view, alive in zip(self.views, keep.tolist()):
+                if alive:
+                    view.index = len(survivors)
+                    survivors.append(view)
+                else:
+                    view.kill()
+            self.views = survivors
+
+    def truncate(self, count):
+        """
+        Drops every critter after the first count, such as critters imported only for
+        the duration of an update.
+        """
+        self.total_age -= int(self.age[count: self.count].sum())
+        self.count = count
+
+    def sync_views(self):
+        """
+        Moves each view to its critter's position and recolours it if its colour has
+        changed. This is only needed before drawing.
+        """
+        xs = self.x[: self.count].astype(np.int64).tolist()
+        ys = self.y[: self.count].astype(np.int64).tolist()
+        reds = self.red[: self.count].tolist()
+        blues = self.blue[: self.count].tolist()
+        for view, x, y, red, blue in zip(self.views, xs, ys, reds, blues):
+            view.rect.topleft = (x, y)
+            colour = surface_cache.quantise((red, 0, blue))
+            if colour != view.colour:
+                view.colour = colour
+                view.image = surface_cache.get(view.size, colour)
@@ -0,0 +1,181 @@
+"""
+A compact binary log of simulation events. Each spawn, death, mating and meal is written
+as a fixed size record, so a run can be replayed or compared with another run without
+simulating it again.
+"""
+
+import enum
+import struct
+import numpy as np
+
+MAGIC = b"CRITLOG1"
+HEADER = struct.Struct("<8sqII")
+RECORD = struct.Struct("<IBIIff")
+
+# Matches RECORD, so a whole log can be read in one call with np.frombuffer.
+RECORD_DTYPE = np.dtype(
+    [
+        ("tick", "<u4"),
+        ("kind", "u1"),
+        ("a", "<u4"),
+        ("b", "<u4"),
+        ("x", "<f4"),
+        ("y", "<f4"),
+    ]
+)
+
+
+class Event(enum.IntEnum):
+    """
+    The kinds of event that can be recorded. The meaning of the a and b fields of a
+    record depends on the kind of event.
+    """
+
+    CRITTER_SPAWNED = 1  # a: critter id
+    CRITTER_DIED = 2  # a: critter id, b: DeathCause
+    CRITTERS_MATED = 3  # a, b: the two critter ids
+    FOOD_SPAWNED = 4  # a: food id, b: food size
+    FOOD_EATEN = 5  # a: food id, b: critter id
+
+
+class DeathCause(enum.IntEnum):
+    """
+    The reasons that a critter can die.
+    """
+
+    OLD_AGE = 1
+    NO_ENERGY = 2
+
+
+class EventLog:
+    """
+    Buffers event records in memory and appends them to a file in large blocks. Until
+    open() is called, recording an event does nothing, so the simulation can always
+    call record() whether or not a log was requested.
+    """
+
+    def __init__(self, flush_size=1 << 16):
+        """
+        Constructor for the EventLog class.
+        @param flush_size The number of buffered bytes that triggers a write to the file.
+        """
+        self.tick = 0
+        self.flush_size = flush_size
+        self._file = None
+        self._buffer = bytearray()
+
+    @property
+    def enabled(self) -> bool:
+        """
+        Read-only: True if events are being written to a file.
+        """
+        return self._file is not None
+
+    def open(self, path, seed, width, height):
+        """
+        Starts a new log file, writing a header that identifies the run.
+        @param path The path of the log file. Any existing file is replaced.
+        @param seed The seed the simulation was started with.
+        @param width, height The size of the world.
+        """
+        self.close()
+        self._file = open(path, "wb")
+        self._file.write(HEADER.pack(MAGIC, seed, width, height))
+
+    def record(self, kind, a, b=0, x=0.0, y=0.0):
+        """
+        Records an event at the current tick.
+        @param kind The Event that took place.
+        @param a, b The ids or values that describe the event (see Event).
+        @param x, y The position at which the event took place.
+        """
+        if self._file is None:
+            return
+        self._buffer += RECORD.pack(self.tick, kind, a, b, x, y)
+        if len(self._buffer) >= self.flush_size:
+            self.flush()
+
+    def flush(self):
+        """
+        Writes any buffered records to the file.
+        """
+        if self._file is not None and self._buffer:
+            self._file.write(self._buffer)
+            self._buffer.clear()
+
+    def close(self):
+        """
+        Flushes and closes the log file, if one is open.
+        """
+        if self._file is not None:
+            self.flush()
+            self._file.close()
+            self._file = None
+
+
+def read_log(path):
+    """
+    Reads a whole event log.
+    @param path The path of the log file.
+    @return A dict describing the run (seed, width, height) and a structured NumPy array
+    of records with the fields of RECORD_DTYPE.
+    """
+    with open(path, "rb") as log_file:
+        data = log_file.read()
+    magic, seed, width, height = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError(f"{path} is not a critter event log")
+    usable = (len(data) - HEADER.size) // RECORD_DTYPE.itemsize * RECORD_DTYPE.itemsize
+    records = np.frombuffer(data, dtype=RECORD_DTYPE, count=usable // RECORD_DTYPE.itemsize,
+                            offset=HEADER.size)
+    return {"seed": seed, "width": width, "height": height}, records
+
+
+def replay(records):
+    """
+    Rebuilds the population history of a run from its events, without simulating it.
+    @param records The records returned by read_log.
+    @return A dict of per-tick NumPy arrays, indexed by tick: the number of critters and
+    food alive at the end of each tick, and the number of births, deaths by each cause,
+    matings and meals during each tick.
+    """
+    ticks = int(records["tick"].max()) + 1 if len(records) else 0
+
+    def per_tick(kind, mask=None):
+        selected = records["kind"] == kind
+        if mask is not None:
+            selected &= mask
+        return np.bincount(records["tick"][selected], minlength=ticks)
+
+    spawned = per_tick(Event.CRITTER_SPAWNED)
+    died_old = per_tick(Event.CRITTER_DIED, records["b"] == DeathCause.OLD_AGE)
+    died_energy = per_tick(Event.CRITTER_DIED, records["b"] == DeathCause.NO_ENERGY)
+    food_spawned = per_tick(Event.FOOD_SPAWNED)
+    eaten = per_tick(Event.FOOD_EATEN)
+
+    return {
+        "critters": np.cumsum(spawned - died_old - died_energy),
+        "food": np.cumsum(food_spawned - eaten),
+        "births": spawned,
+        "died_of_old_age": died_old,
+        "died_of_no_energy": died_energy,
+        "matings": per_tick(Event.CRITTERS_MATED),
+        "food_eaten": eaten,
+    }
+
+
+def first_difference(records, other_records):
+    """
+    Compares the events of two runs.
+    @return The index of the first record that differs, or None if the runs are identical.
+    """
+    common = min(len(records), len(other_records))
+    differs = np.flatnonzero(records[:common] != other_records[:common])
+    if len(differs):
+        return int(differs[0])
+    if len(records) != len(other_records):
+        return common
+    return None
+
+
+events = EventLog()
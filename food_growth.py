@@ -0,0 +1,126 @@
+"""
+Food regrowth. The world is divided into a grid of patches, each with a fertility that
+weights how much of the new food grows there and a carrying capacity that it cannot
+grow beyond, so the total amount of food, and the cost of handling it, stays bounded.
+New food is planned in vectorised batches and only then turned into sprites.
+"""
+
+import numpy as np
+from config import config
+
+
+class PatchGrid:
+    """
+    The grid of patches that food grows in. Patches cover the world inside the spawn
+    buffer, in row-major order.
+    """
+
+    def __init__(self, width, height, buffer, columns, rows):
+        """
+        Constructor for the PatchGrid class.
+        @param width, height The size of the world.
+        @param buffer The margin around the edge of the world where no food grows.
+        @param columns, rows The number of patches across and down.
+        """
+        self.left = buffer
+        self.top = buffer
+        self.width = max(1, width - 2 * buffer)
+        self.height = max(1, height - 2 * buffer)
+        self.columns = columns
+        self.rows = rows
+        self.count = columns * rows
+
+    @classmethod
+    def from_config(cls) -> "PatchGrid":
+        """
+        Returns the patch grid described by the application config.
+        """
+        return cls(config.screen_width, config.screen_height, config.spawn_buffer_size,
+                   config.food_patch_columns, config.food_patch_rows)
+
+    def index(self, x, y):
+        """
+        Returns the patch that contains each point, clamped to the grid.
+        @param x, y Arrays of coordinates.
+        """
+        column = np.clip(((np.asarray(x) - self.left) * self.columns // self.width).astype(np.int64),
+                         0, self.columns - 1)
+        row = np.clip(((np.asarray(y) - self.top) * self.rows // self.height).astype(np.int64),
+                      0, self.rows - 1)
+        return row * self.columns + column
+
+    def occupancy(self, x, y):
+        """
+        Returns the number of points in each patch.
+        @param x, y Arrays of coordinates, such as the centres of every item of food.
+        """
+        return np.bincount(self.index(x, y), minlength=self.count)
+
+
+class FoodGrowth:
+    """
+    Decides where new food grows and how large it is. Each patch's share of new food is
+    proportional to its fertility and to its remaining capacity, so growth slows as a
+    patch fills up and stops when it is full.
+    """
+
+    def __init__(self, grid, capacity, fertility_spread, generator):
+        """
+        Constructor for the FoodGrowth class.
+        @param grid The PatchGrid that food grows in.
+        @param capacity The largest number of items of food in any one patch.
+        @param fertility_spread How much fertility varies between patches, from 0 (every
+        patch the same) to 1 (from barren to twice the average).
+        @param generator The NumPy random generator to draw from.
+        """
+        self.grid = grid
+        self.capacity = capacity
+        self.generator = generator
+        self.fertility = 1.0 + fertility_spread * generator.uniform(-1.0, 1.0, grid.count)
+
+    @classmethod
+    def from_config(cls, generator) -> "FoodGrowth":
+        """
+        Returns the food growth described by the application config.
+        @param generator The NumPy random generator to draw from.
+        """
+        return cls(PatchGrid.from_config(), config.food_patch_capacity,
+                   config.food_fertility_spread, generator)
+
+    def allocate(self, count, occupancy):
+        """
+        Returns the number of new items of food for each patch.
+        @param count The number of items wanted. Fewer are allocated if the patches fill.
+        @param occupancy The number of items of food already in each patch.
+        """
+        free = np.maximum(self.capacity - occupancy, 0)
+        allocated = np.zeros(self.grid.count, dtype=np.int64)
+        remaining = min(count, int(free.sum()))
+        while remaining > 0:
+            weights = self.fertility * (free - allocated)
+            if weights.sum() <= 0:
+                break
+            drawn = self.generator.multinomial(remaining, weights / weights.sum())
+            allocated = np.minimum(allocated + drawn, free)
+            remaining = min(count, int(free.sum())) - int(allocated.sum())
+        return allocated
+
+    def plan(self, count, occupancy):
+        """
+        Plans a batch of new food.
+        @param count The number of items wanted.
+        @param occupancy The number of items of food already in each patch.
+        @return Arrays of the centre x, centre y and size of each new item.
+        """
+        grid = self.grid
+        patches = np.repeat(np.arange(grid.count), self.allocate(count, occupancy))
+        column = patches % grid.columns
+        row = patches // grid.columns
+        x = grid.left + (column + self.generator.random(len(patches))) * grid.width / grid.columns
+        y = grid.top + (row + self.generator.random(len(patches))) * grid.height / grid.rows
+        if config.food_has_random_size:
+            size = self.generator.integers(config.food_min_size, config.food_max_size,
+                                           len(patches), endpoint=True)
+        else:
+            size = np.full(len(patches), config.food_fixed_size, dtype=np.int64)
+        return x.astype(np.int64), y.astype(np.int64), size
@@ -1,30 +1,106 @@
 '''
 Sprite classes
 '''
-import random
 import math
-import enum
+import numpy as np
 import pygame
 from config import config
+from event_log import events, Event
+from renderer import FOOD_LAYER
+from sprite_pool import SpritePool
+from surface_cache import surface_cache
 
+FOOD_COLOUR = (0, 255, 0)
 
-class FoodSprite(pygame.sprite.Sprite):
+
+class FoodSprite(pygame.sprite.DirtySprite):
     '''
-    The FoodSprite class 
+    The FoodSprite class. Food that is eaten is kept in a pool and reinitialised by
+    create() rather than allocating a new sprite.
     '''
-    def __init__(self, x, y):
+    _layer = FOOD_LAYER
+    next_id = 1
+    pool = SpritePool(config.simulation_pool_size)
+
+    def __init__(self, x, y, size):
         '''
         Constructor for the FoodSprite class.
         '''
         super().__init__()
-        self.size = config.critter_size
-        self.image = pygame.Surface((self.size, self.size))
-        self.image.fill([0, 255, 0])
-        self.rect = self.image.get_rect()
-        self.rect.center = (x, y)
+        self.rect = pygame.Rect(0, 0, 0, 0)
         self.log = config.logger
+        self.reset(x, y, size)
+
+    @classmethod
+    def create(cls, x, y, size) -> 'FoodSprite':
+        '''
+        Returns a new item of food of the given size centred on (x, y), reusing a dead
+        one if there is one.
+        '''
+        food = cls.pool.acquire()
+        if food is None:
+            return cls(x, y, size)
+        food.reset(x, y, size)
+        return food
+
+    def reset(self, x, y, size):
+        '''
+        Initialises the food as a new item of the given size centred on (x, y), in place.
+        '''
+        self.dirty = 1
+        self.id = FoodSprite.next_id
+        FoodSprite.next_id += 1
+        self.size = size
+        self.image = surface_cache.get(self.size, FOOD_COLOUR)
+        self.rect.size = self.image.get_size()
+        self.rect.center = (x, y)
         self.next_update_time = 0
-        
+        events.record(Event.FOOD_SPAWNED, self.id, self.size, x, y)
+
+    @staticmethod
+    def export_all(food_sprites) -> dict:
+        '''
+        Returns the centre, size and id of the given food as a dict of arrays.
+        '''
+        food_sprites = list(food_sprites)
+        count = len(food_sprites)
+        return {
+            'x': np.fromiter((food.rect.centerx for food in food_sprites), np.int64, count),
+            'y': np.fromiter((food.rect.centery for food in food_sprites), np.int64, count),
+            'size': np.fromiter((food.size for food in food_sprites), np.int64, count),
+            'ids': np.fromiter((food.id for food in food_sprites), np.int64, count),
+        }
+
+    @classmethod
+    def restore_all(cls, state) -> list:
+        '''
+        Recreates food from a dict of arrays returned by export_all, setting attributes
+        directly so that no random values are drawn and no spawn events recorded.
+        '''
+        food_sprites = []
+        init = pygame.sprite.DirtySprite.__init__
+        logger = config.logger
+        for x, y, size, food_id in zip(state['x'].tolist(), state['y'].tolist(),
+                                       state['size'].tolist(), state['ids'].tolist()):
+            food = cls.__new__(cls)
+            init(food)
+            food.log = logger
+            food.id = food_id
+            food.size = size
+            food.next_update_time = 0
+            food.image = surface_cache.get(size, FOOD_COLOUR)
+            food.rect = food.image.get_rect(center=(x, y))
+            food_sprites.append(food)
+        return food_sprites
+
+    def kill(self):
+        '''
+        Removes the food from all groups and returns it to the pool (overrides base function).
+        '''
+        if self.alive():
+            super().kill()
+            FoodSprite.pool.release(self)
+
     def draw(self):
         '''
         Draws a sprite on the screen (overrides base function).
@@ -37,11 +113,9 @@ class FoodSprite(pygame.sprite.Sprite):
         '''
         return math.pow(self.size, 2) * config.food_energy_scale
 
-
-
     def update(self):
         '''
-        Updates the food group, including respawning food.
+        Updates the food sprite. Food does not change once it has been created, so there
+        is nothing to do; its image is a shared surface that is never redrawn.
         '''
-        self.image.fill((0, 255, 0))
 
@@ -0,0 +1,367 @@
+"""
+The lineage of every critter of a run: its id, its parents' ids, when it was born and
+died and its genes, in append-only arrays. Histograms and running moments of the genes
+of the living population are updated as critters are born and die, and copied every
+few updates, so that the gene distribution at any tick is rebuilt from the nearest copy
+and the births and deaths since, rather than from the whole history.
+"""
+
+import numpy as np
+
+# The parent id of critters that were not born from a mating.
+NO_PARENT = 0
+
+
+def _grow(array, needed):
+    """
+    Returns array, or a copy of it with room for at least needed rows.
+    """
+    if needed <= len(array):
+        return array
+    grown = np.zeros((max(needed, len(array) * 2), *array.shape[1:]), dtype=array.dtype)
+    grown[: len(array)] = array
+    return grown
+
+
+class Lineage:
+    """
+    Records births and deaths. Until start() is called, recording does nothing, so the
+    simulation can always record whether or not a lineage was requested.
+    Ids must be recorded in increasing order, as both engines hand them out, so that an
+    id is found by binary search. Births and deaths are buffered during an update and
+    applied when the next one begins.
+    """
+
+    def __init__(self):
+        """
+        Constructor for the Lineage class.
+        """
+        self._enabled = False
+        self._clear((), 1, 1, 0)
+
+    @property
+    def enabled(self) -> bool:
+        """
+        Read-only: True if births and deaths are being recorded.
+        """
+        return self._enabled
+
+    def start(self, gene_names, bins, history_interval, capacity=1024):
+        """
+        Starts recording, forgetting anything recorded before.
+        @param gene_names The name of each gene, in the order that genes are recorded.
+        @param bins The number of equal bins between -1 and 1 in each gene's histogram.
+        @param history_interval The number of updates between copies of the histograms.
+        @param capacity The number of critters to allocate space for initially.
+        """
+        self._clear(gene_names, bins, history_interval, capacity)
+        self._enabled = True
+
+    def _clear(self, gene_names, bins, history_interval, capacity):
+        """
+        Forgets everything recorded and allocates empty arrays.
+        """
+        genes = len(gene_names)
+        self.tick = 0
+        self.gene_names = tuple(gene_names)
+        self.bins = bins
+        self.history_interval = history_interval
+        self.count = 0
+        self.death_count = 0
+        self.ids = np.zeros(capacity, dtype=np.uint32)
+        self.parents = np.zeros((capacity, 2), dtype=np.uint32)
+        self.born = np.zeros(capacity, dtype=np.uint32)
+        self.genes = np.zeros((capacity, genes), dtype=np.float32)
+        self.death_rows = np.zeros(capacity, dtype=np.uint32)
+        self.death_ticks = np.zeros(capacity, dtype=np.uint32)
+
+        # The living population, kept up to date on every birth and death.
+        self.living = 0
+        self.histogram = np.zeros((genes, bins), dtype=np.int64)
+        self.gene_sums = np.zeros(genes)
+        self.gene_squares = np.zeros(genes)
+
+        # A copy of the living population every history_interval updates, along with
+        # the numbers of births and deaths that had been recorded when it was taken.
+        self.history_ticks = []
+        self.history_counts = []
+        self.history_histograms = []
+        self.history_moments = []
+        self._pending_births = []
+        self._pending_deaths = []
+
+    def stop(self):
+        """
+        Stops recording. What has been recorded can still be queried.
+        """
+        self.flush()
+        self._enabled = False
+
+    def record_birth(self, critter_id, parents, genes):
+        """
+        Records a critter joining the population at the current tick.
+        @param critter_id The critter's id.
+        @param parents The ids of its two parents, or NO_PARENT for a critter that was
+        not born from a mating.
+        @param genes The value of each gene, in the order of gene_names.
+        """
+        if self._enabled:
+            self._pending_births.append(([critter_id], [parents], [genes]))
+
+    def record_births(self, ids, parents, genes):
+        """
+        Records several critters joining the population at the current tick.
+        @param ids An array of the critters' ids, in increasing order.
+        @param parents An array with the two parent ids of each critter, or None if
+        none of them were born from a mating.
+        @param genes An array with one row of genes for each critter.
+        """
+        if not self._enabled or len(ids) == 0:
+            return
+        if parents is None:
+            parents = np.full((len(ids), 2), NO_PARENT)
+        # The arrays are copied because they may be views of arrays that are about to change.
+        self._pending_births.append((np.array(ids), np.array(parents), np.array(genes)))
+
+    def record_death(self, critter_id):
+        """
+        Records a critter leaving the population at the current tick.
+        """
+        if self._enabled:
+            self._pending_deaths.append(critter_id)
+
+    def record_deaths(self, ids):
+        """
+        Records several critters leaving the population at the current tick.
+        @param ids An array of the critters' ids.
+        """
+        if self._enabled:
+            self._pending_deaths.extend(ids.tolist())
+
+    def advance(self, tick):
+        """
+        Applies the births and deaths recorded so far and moves on to a new tick,
+        copying the living population first if the tick is a multiple of
+        history_interval.
+        @param tick The number of updates that have taken place so far.
+        """
+        if not self._enabled:
+            return
+        self.flush()
+        # The first copy is taken whenever recording starts, so that every later tick
+        # has one to start from.
+        if not self.history_ticks or (tick % self.history_interval == 0
+                                      and self.history_ticks[-1] != tick):
+            self.history_ticks.append(tick)
+            self.history_counts.append((self.count, self.death_count))
+            self.history_histograms.append(self.histogram.copy())
+            self.history_moments.append((self.living, self.gene_sums.copy(), self.gene_squares.copy()))
+        self.tick = tick
+
+    def flush(self):
+        """
+        Applies the buffered births and deaths at the current tick.
+        """
+        if self._pending_births:
+            ids, parents, genes = (np.concatenate([np.asarray(values) for values in chunk])
+                                   for chunk in zip(*self._pending_births))
+            self._pending_births = []
+            if self.count and ids[0] <= self.ids[self.count - 1]:
+                raise ValueError("Critters must be recorded in increasing order of id")
+            start, end = self.count, self.count + len(ids)
+            for name in ("ids", "parents", "born", "genes"):
+                setattr(self, name, _grow(getattr(self, name), end))
+            self.ids[start:end] = ids
+            self.parents[start:end] = parents
+            self.born[start:end] = self.tick
+            self.genes[start:end] = genes
+            self.count = end
+            self._add_living(self.genes[start:end], 1)
+
+        if self._pending_deaths:
+            rows = self.rows_of(np.array(self._pending_deaths))
+            self._pending_deaths = []
+            # Critters from before recording started are not in the lineage.
+            rows = rows[rows >= 0]
+            start, end = self.death_count, self.death_count + len(rows)
+            self.death_rows = _grow(self.death_rows, end)
+            self.death_ticks = _grow(self.death_ticks, end)
+            self.death_rows[start:end] = rows
+            self.death_ticks[start:end] = self.tick
+            self.death_count = end
+            self._add_living(self.genes[rows], -1)
+
+    def _add_living(self, genes, sign):
+        """
+        Adds critters with the given genes to the living population's histograms and
+        moments, or removes them if sign is -1.
+        """
+        self.living += sign * len(genes)
+        self.histogram += sign * self.bin_counts(genes)
+        values = genes.astype(np.float64)
+        self.gene_sums += sign * values.sum(axis=0)
+        self.gene_squares += sign * (values * values).sum(axis=0)
+
+    def bin_counts(self, genes) -> np.ndarray:
+        """
+        Returns the histogram of each gene over some critters, with one row per gene.
+        @param genes An array with one row of genes for each critter.
+        """
+        columns = genes.shape[1]
+        bins = np.clip(((genes + 1.0) * (self.bins / 2)).astype(np.int64), 0, self.bins - 1)
+        # Each gene's bins are numbered after the previous gene's, so one count does all.
+        flat = bins + np.arange(columns) * self.bins
+        counts = np.bincount(flat.ravel(), minlength=columns * self.bins)
+        return counts.reshape(columns, self.bins)
+
+    def rows_of(self, ids) -> np.ndarray:
+        """
+        Returns the row of the lineage that holds each critter, or -1 for critters that
+        are not in it.
+        @param ids An array of critter ids.
+        """
+        known = self.ids[: self.count]
+        rows = np.searchsorted(known, ids)
+        found = rows < self.count
+        found[found] = known[rows[found]] == np.asarray(ids)[found]
+        return np.where(found, rows, -1)
+
+    def parents_of(self, critter_id) -> tuple:
+        """
+        Returns the ids of a critter's two parents, or NO_PARENT for each if it was not
+        born from a mating.
+        @raise KeyError If the critter is not in the lineage.
+        """
+        self.flush()
+        row = int(self.rows_of(np.array([critter_id]))[0])
+        if row < 0:
+            raise KeyError(f"Critter {critter_id} is not in the lineage")
+        return tuple(self.parents[row].tolist())
+
+    def ancestry(self, critter_id, generations=None) -> list:
+        """
+        Returns the ancestors of a critter, one generation at a time. Each generation
+        takes one binary search over the lineage, however long the run.
+        @param critter_id The critter whose ancestors are wanted.
+        @param generations The number of generations to go back, or None to go back to
+        the critters that were not born from a mating.
+        @return A list whose first item is an array of the critter's parents' ids, the
+        second its grandparents' ids and so on, each in increasing order without repeats.
+        @raise KeyError If the critter is not in the lineage.
+        """
+        self.flush()
+        rows = self.rows_of(np.array([critter_id]))
+        if rows[0] < 0:
+            raise KeyError(f"Critter {critter_id} is not in the lineage")
+        ancestors = []
+        while generations is None or len(ancestors) < generations:
+            ids = np.unique(self.parents[rows])
+            ids = ids[ids != NO_PARENT]
+            if len(ids) == 0:
+                break
+            ancestors.append(ids)
+            rows = self.rows_of(ids)
+            rows = rows[rows >= 0]
+        return ancestors
+
+    def distribution_at(self, tick) -> dict:
+        """
+        Returns the genes of the population living at the end of a tick, rebuilt from
+        the latest copy taken at or before it and the births and deaths since.
+        @param tick The number of updates that had taken place.
+        @return A dict of the number of living critters ("living"), the histogram of
+        each gene with one row per gene ("histogram"), and each gene's mean and variance
+        ("mean", "variance"), which are NaN for an empty population.
+        """
+        self.flush()
+        copy = np.searchsorted(self.history_ticks, tick, side="right") - 1
+        if copy < 0:
+            raise ValueError(f"Tick {tick} is before the lineage began")
+        first_birth, first_death = self.history_counts[copy]
+        living, sums, squares = self.history_moments[copy]
+        histogram = self.history_histograms[copy].copy()
+
+        last_birth = np.searchsorted(self.born[: self.count], tick, side="right")
+        last_death = np.searchsorted(self.death_ticks[: self.death_count], tick, side="right")
+        born = self.genes[first_birth:last_birth].astype(np.float64)
+        died = self.genes[self.death_rows[first_death:last_death]].astype(np.float64)
+        living += len(born) - len(died)
+        histogram += self.bin_counts(born) - self.bin_counts(died)
+        sums = sums + born.sum(axis=0) - died.sum(axis=0)
+        squares = squares + (born * born).sum(axis=0) - (died * died).sum(axis=0)
+        return {"living": living, "histogram": histogram, **_moments(living, sums, squares)}
+
+    def current_distribution(self) -> dict:
+        """
+        Returns the genes of the living population, in the form of distribution_at,
+        from the running totals.
+        """
+        self.flush()
+        return {"living": self.living, "histogram": self.histogram.copy(),
+                **_moments(self.living, self.gene_sums, self.gene_squares)}
+
+    def save(self, path):
+        """
+        Writes the lineage to a compressed NumPy .npz file, for load().
+        """
+        self.flush()
+        living, sums, squares = zip(*self.history_moments) if self.history_moments else ((), (), ())
+        genes = len(self.gene_names)
+        np.savez_compressed(
+            path,
+            gene_names=np.array(self.gene_names),
+            bins=np.array(self.bins),
+            history_interval=np.array(self.history_interval),
+            tick=np.array(self.tick),
+            ids=self.ids[: self.count],
+            parents=self.parents[: self.count],
+            born=self.born[: self.count],
+            genes=self.genes[: self.count],
+            death_rows=self.death_rows[: self.death_count],
+            death_ticks=self.death_ticks[: self.death_count],
+            history_ticks=np.array(self.history_ticks, dtype=np.int64),
+            history_counts=np.array(self.history_counts, dtype=np.int64).reshape(-1, 2),
+            history_histograms=np.array(self.history_histograms, dtype=np.int64).reshape(
+                -1, genes, self.bins),
+            history_living=np.array(living, dtype=np.int64),
+            history_sums=np.array(sums).reshape(-1, genes),
+            history_squares=np.array(squares).reshape(-1, genes),
+        )
+
+    @classmethod
+    def load(cls, path) -> "Lineage":
+        """
+        Reads a lineage written by save(). The lineage can be queried but not recorded to.
+        """
+        lineage = cls()
+        with np.load(path) as arrays:
+            lineage._clear(tuple(arrays["gene_names"].tolist()), int(arrays["bins"]),
+                           int(arrays["history_interval"]), 0)
+            lineage.tick = int(arrays["tick"])
+            for name in ("ids", "parents", "born", "genes", "death_rows", "death_ticks"):
+                setattr(lineage, name, arrays[name])
+            lineage.count = len(lineage.ids)
+            lineage.death_count = len(lineage.death_rows)
+            lineage.history_ticks = arrays["history_ticks"].tolist()
+            lineage.history_counts = [tuple(counts) for counts in arrays["history_counts"].tolist()]
+            lineage.history_histograms = list(arrays["history_histograms"])
+            lineage.history_moments = list(zip(arrays["history_living"].tolist(),
+                                               arrays["history_sums"], arrays["history_squares"]))
+        alive = np.ones(lineage.count, dtype=bool)
+        alive[lineage.death_rows] = False
+        lineage._add_living(lineage.genes[alive], 1)
+        return lineage
+
+
+def _moments(living, sums, squares) -> dict:
+    """
+    Returns the mean and variance of each gene from the sums of the genes and of their
+    squares over a population.
+    """
+    if living <= 0:
+        return {"mean": np.full(len(sums), np.nan), "variance": np.full(len(sums), np.nan)}
+    mean = sums / living
+    return {"mean": mean, "variance": np.maximum(squares / living - mean * mean, 0.0)}
+
+
+lineage = Lineage()
@@ -0,0 +1,67 @@
+"""
+Answers questions about a lineage written by the simulation (see lineage.py): the
+ancestors of a critter, and the distribution of genes at any tick of the run.
+"""
+
+import argparse
+import sys
+from lineage import Lineage
+
+
+def main(argv):
+    """
+    Prints a summary of a lineage and the answer to each question asked.
+    @param argv The command line arguments, excluding the program name.
+    """
+    parser = argparse.ArgumentParser(description="Query a critter lineage.")
+    parser.add_argument("lineage", help="The lineage file to query.")
+    parser.add_argument(
+        "--ancestry", type=int, action="append", default=[], metavar="ID",
+        help="A critter whose ancestors to list.",
+    )
+    parser.add_argument(
+        "--generations", type=int, default=None,
+        help="Generations of ancestors to list, by default all of them.",
+    )
+    parser.add_argument(
+        "--genes-at", type=int, action="append", default=[], metavar="TICK",
+        help="A tick at whose end to report the distribution of genes.",
+    )
+    args = parser.parse_args(argv)
+
+    lineage = Lineage.load(args.lineage)
+    print(
+        f"{lineage.count} critters, {lineage.death_count} deaths, "
+        f"{len(lineage.history_ticks)} copies of the gene histograms up to tick {lineage.tick}"
+    )
+
+    for critter_id in args.ancestry:
+        try:
+            ancestors = lineage.ancestry(critter_id, args.generations)
+        except KeyError as error:
+            print(error.args[0])
+            return 1
+        print(f"Critter {critter_id}, parents {lineage.parents_of(critter_id)}:")
+        for generation, ids in enumerate(ancestors, 1):
+            shown = " ".join(str(critter) for critter in ids[:10].tolist())
+            more = f" and {len(ids) - 10} more" if len(ids) > 10 else ""
+            print(f"{generation:>10}: {len(ids)} ancestors: {shown}{more}")
+
+    for tick in args.genes_at:
+        try:
+            distribution = lineage.distribution_at(tick)
+        except ValueError as error:
+            print(error.args[0])
+            return 1
+        print(f"Tick {tick}: {distribution['living']} critters")
+        print(f"{'gene':>10} {'mean':>10} {'variance':>10}  histogram from -1 to 1")
+        for name, mean, variance, counts in zip(
+            lineage.gene_names, distribution["mean"], distribution["variance"],
+            distribution["histogram"],
+        ):
+            print(f"{name:>10} {mean:>10.4f} {variance:>10.4f}  {' '.join(map(str, counts.tolist()))}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,140 @@
+"""
+Streaming population metrics. Aggregates are sampled every few updates into a fixed size
+ring buffer, and a background thread appends them to a CSV file in batches, so a run of
+any length can be studied afterwards without slowing the simulation or growing memory.
+"""
+
+import os
+import queue
+import threading
+import numpy as np
+from creature_sprite import GENE_NAMES
+
+
+def metric_columns(energy_bins) -> tuple:
+    """
+    Returns the name of every column of a metrics sample.
+    @param energy_bins The number of bins in the energy histogram.
+    """
+    columns = [
+        "tick", "population", "food", "died_of_old_age", "died_of_no_energy",
+        "age_mean", "age_std", "age_p25", "age_p50", "age_p75", "age_max",
+        "energy_mean",
+    ]
+    for name in GENE_NAMES:
+        columns += [f"gene_{name}_mean", f"gene_{name}_var"]
+    columns += [f"energy_bin_{index}" for index in range(energy_bins)]
+    return tuple(columns)
+
+
+def sample_row(tick, population, food, died_of_old_age, died_of_no_energy, ages, genes,
+               energy, energy_bins, max_energy):
+    """
+    Returns one metrics sample, in the order of metric_columns(energy_bins).
+    @param tick The number of updates that have taken place so far.
+    @param population The number of living critters.
+    @param food The number of items of food.
+    @param died_of_old_age, died_of_no_energy The number of deaths by each cause so far.
+    @param ages, genes, energy Arrays of every living critter's age, genes (one row per
+    critter, in the order of GENE_NAMES) and energy. They may be empty when the critters
+    are only counted, in which case the columns that describe them are NaN.
+    @param energy_bins The number of equal bins between 0 and max_energy in the energy
+    histogram. Energy outside that range is counted in the first or last bin.
+    @param max_energy The upper edge of the energy histogram.
+    """
+    row = [tick, population, food, died_of_old_age, died_of_no_energy]
+    if len(ages):
+        p25, p50, p75 = np.percentile(ages, (25, 50, 75))
+        row += [ages.mean(), ages.std(), p25, p50, p75, ages.max(), energy.mean()]
+        for mean, variance in zip(genes.mean(axis=0), genes.var(axis=0)):
+            row += [mean, variance]
+        bins = np.clip((energy * (energy_bins / max_energy)).astype(np.int64), 0, energy_bins - 1)
+        row += np.bincount(bins, minlength=energy_bins).tolist()
+    else:
+        # The energy histogram is only known to be empty if there are no critters.
+        row += [np.nan] * (7 + 2 * len(GENE_NAMES)) + [np.nan if population else 0] * energy_bins
+    return row
+
+
+class MetricsRecorder:
+    """
+    Keeps the latest samples in a ring buffer and hands full batches to a writer thread,
+    which appends them to a CSV file. If the writer falls so far behind that the ring
+    fills, the oldest unwritten samples are overwritten and counted in dropped.
+    """
+
+    def __init__(self, path, energy_bins, max_energy, capacity=4096, batch_size=256):
+        """
+        Constructor for the MetricsRecorder class. The writer thread starts immediately.
+        @param path The CSV file to append to. A header is written if it is new or empty.
+        @param energy_bins The number of bins in the energy histogram.
+        @param max_energy The upper edge of the energy histogram.
+        @param capacity The number of samples the ring buffer holds.
+        @param batch_size The number of samples written to the file at a time.
+        """
+        self.path = path
+        self.energy_bins = energy_bins
+        self.max_energy = max_energy
+        self.columns = metric_columns(energy_bins)
+        self.buffer = np.zeros((capacity, len(self.columns)))
+        self.batch_size = min(batch_size, capacity)
+        self.recorded = 0
+        self.flushed = 0
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=4)
+        self._thread = threading.Thread(target=self._run, name="metrics-writer", daemon=True)
+        self._thread.start()
+
+    def record(self, tick, population, food, died_of_old_age, died_of_no_energy, ages, genes,
+               energy):
+        """
+        Samples the population (see sample_row) into the ring buffer, and queues a batch
+        for writing once enough samples are waiting.
+        """
+        capacity = len(self.buffer)
+        self.buffer[self.recorded % capacity] = sample_row(
+            tick, population, food, died_of_old_age, died_of_no_energy, ages, genes, energy,
+            self.energy_bins, self.max_energy,
+        )
+        self.recorded += 1
+        if self.recorded - self.flushed > capacity:
+            self.dropped += self.recorded - self.flushed - capacity
+            self.flushed = self.recorded - capacity
+        if self.recorded - self.flushed >= self.batch_size:
+            self.flush(block=False)
+
+    def flush(self, block=True):
+        """
+        Queues every sample that has not been written yet.
+        @param block If False and the writer is busy, the samples are left in the ring
+        buffer to be queued later.
+        """
+        if self.recorded == self.flushed:
+            return
+        capacity = len(self.buffer)
+        rows = np.take(self.buffer, np.arange(self.flushed, self.recorded) % capacity, axis=0)
+        try:
+            self._queue.put(rows, block=block)
+        except queue.Full:
+            return
+        self.flushed = self.recorded
+
+    def _run(self):
+        new_file = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+        with open(self.path, "a", encoding="utf-8") as metrics_file:
+            if new_file:
+                metrics_file.write(",".join(self.columns) + "\n")
+            while True:
+                rows = self._queue.get()
+                if rows is None:
+                    break
+                np.savetxt(metrics_file, rows, fmt="%.10g", delimiter=",")
+                metrics_file.flush()
+
+    def close(self):
+        """
+        Writes any remaining samples and stops the writer thread.
+        """
+        self.flush()
+        self._queue.put(None)
+        self._thread.join()
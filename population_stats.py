@@ -0,0 +1,94 @@
+"""
+Population statistics that are kept up to date as critters are born, age and die, so
+they never have to be recalculated by scanning every critter.
+"""
+
+import pygame
+
+
+class PopulationStats:
+    """
+    Running totals for a population of critters. Critters are remembered in the order
+    they were added, which is also oldest first, because every living critter ages by
+    one on each update and new critters are born with an age of zero.
+    """
+
+    def __init__(self):
+        """
+        Constructor for the PopulationStats class.
+        """
+        self.total_age = 0
+        self._living = {}
+
+    @property
+    def count(self) -> int:
+        """
+        Read-only: Returns the number of living critters.
+        """
+        return len(self._living)
+
+    @property
+    def average_age(self) -> int:
+        """
+        Read-only: Returns the average age of the living critters, rounded down.
+        """
+        return self.total_age // len(self._living) if self._living else 0
+
+    @property
+    def oldest_age(self) -> int:
+        """
+        Read-only: Returns the age of the oldest living critter.
+        """
+        return next(iter(self._living)).age if self._living else 0
+
+    def add(self, critter):
+        """
+        Records a critter joining the population.
+        """
+        self._living[critter] = None
+        self.total_age += critter.age
+
+    def remove(self, critter):
+        """
+        Records a critter leaving the population, at its current age.
+        """
+        del self._living[critter]
+        self.total_age -= critter.age
+
+    def age_all(self, count):
+        """
+        Records every critter that was alive at the start of an update ageing by one.
+        Critters that died during the update were removed at their new age, so adding
+        one per critter that started the update keeps the total exact.
+        @param count The number of critters alive at the start of the update.
+        """
+        self.total_age += count
+
+
+class CritterGroup(pygame.sprite.Group):
+    """
+    A sprite group that keeps PopulationStats for its members up to date as they are
+    added and removed (including through kill()).
+    """
+
+    def __init__(self, *sprites):
+        """
+        Constructor for the CritterGroup class.
+        @param sprites Any sprites to add to the group immediately.
+        """
+        self.stats = PopulationStats()
+        super().__init__(*sprites)
+
+    def add_internal(self, sprite, layer=None):
+        """
+        Adds the sprite to the group and to the population statistics.
+        """
+        super().add_internal(sprite, layer)
+        self.stats.add(sprite)
+
+    def remove_internal(self, sprite):
+        """
+        Removes the sprite from the group and from the population statistics.
+        """
+        super().remove_internal(sprite)
+        self.stats.remove(sprite)
@@ -0,0 +1,150 @@
+"""
+Low overhead timing of each phase of a frame, with rolling percentiles, and cProfile
+traces of a number of frames on request.
+"""
+
+import contextlib
+import cProfile
+import time
+import numpy as np
+
+# The phases of the main loop, followed by the steps of a critter update.
+LOOP_PHASES = ("events", "update", "spawn", "render", "wait")
+CRITTER_PHASES = ("movement", "energy", "edges", "food", "mating", "ageing", "colour")
+PHASES = LOOP_PHASES + CRITTER_PHASES
+
+
+class Profiler:
+    """
+    Accumulates the time spent in each phase during a frame and keeps the per-frame
+    totals of the last window frames in a ring buffer. Timing is only done while
+    enabled is set, so the hot paths only pay for checking it otherwise.
+    """
+
+    def __init__(self, window=300, refresh=30):
+        """
+        Constructor for the Profiler class.
+        @param window The number of frames that percentiles are taken over.
+        @param refresh The number of frames between updates of the panel values.
+        """
+        self.enabled = False
+        self.window = window
+        self.refresh = refresh
+        self.frames = 0
+        self.history = np.zeros((len(PHASES), window))
+        self._index = {name: index for index, name in enumerate(PHASES)}
+        self._frame = np.zeros(len(PHASES))
+        self._panel_values = ("",) * len(PHASES)
+        self._trace = None
+        self._trace_frames = 0
+        self.trace_path = ""
+
+    def add(self, name, seconds):
+        """
+        Adds time spent in a phase during the current frame.
+        """
+        self._frame[self._index[name]] += seconds
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        """
+        Times the body of a with statement as part of the named phase.
+        """
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._frame[self._index[name]] += time.perf_counter() - start
+
+    def end_frame(self, tick):
+        """
+        Records the current frame's totals and starts a new frame. Also stops a trace
+        once it has covered the requested number of frames.
+        @param tick The number of updates that have taken place so far.
+        @return The path of a trace that was just written, or an empty string.
+        """
+        if self.enabled:
+            self.history[:, self.frames % self.window] = self._frame
+            self._frame[:] = 0.0
+            self.frames += 1
+        if self._trace is not None:
+            self._trace_frames -= 1
+            if self._trace_frames <= 0:
+                return self.stop_trace(tick)
+        return ""
+
+    def percentiles(self) -> dict:
+        """
+        Returns the 50th and 99th percentile of each phase's time per frame, in
+        milliseconds, over the last window frames.
+        """
+        filled = self.history[:, : min(self.frames, self.window)]
+        if filled.shape[1] == 0:
+            return {name: (0.0, 0.0) for name in PHASES}
+        p50, p99 = np.percentile(filled, (50, 99), axis=1) * 1000
+        return {name: (p50[index], p99[index]) for name, index in self._index.items()}
+
+    def panel_labels(self) -> tuple:
+        """
+        Returns a sidebar label for each phase.
+        """
+        return tuple(f"{name} p50/p99: " for name in PHASES)
+
+    def panel_values(self) -> tuple:
+        """
+        Returns a sidebar value for each phase. The values are only recalculated every
+        refresh frames so that the sidebar text is not rendered again on every frame.
+        """
+        if self.frames % self.refresh == 0:
+            self._panel_values = tuple(
+                f"{p50:.2f} / {p99:.2f} ms" for p50, p99 in self.percentiles().values()
+            )
+        return self._panel_values
+
+    def summary(self) -> str:
+        """
+        Returns the percentiles of every phase that took any time, as one line.
+        """
+        return ", ".join(
+            f"{name} {p50:.2f}/{p99:.2f}"
+            for name, (p50, p99) in self.percentiles().items()
+            if p99 > 0
+        ) + " ms p50/p99"
+
+    @property
+    def tracing(self) -> bool:
+        """
+        Read-only: True while a cProfile trace is being taken.
+        """
+        return self._trace is not None
+
+    def start_trace(self, frames):
+        """
+        Starts a cProfile trace that stops after the given number of frames. Nothing
+        happens if a trace is already being taken.
+        """
+        if self._trace is not None:
+            return
+        self._trace_frames = max(1, frames)
+        self._trace = cProfile.Profile()
+        self._trace.enable()
+
+    def stop_trace(self, tick) -> str:
+        """
+        Stops the current trace and writes it in pstats format, which snakeviz,
+        flameprof and gprof2dot can turn into a flame graph.
+        @param tick The number of updates that have taken place so far, used to name
+        the file.
+        @return The path of the trace file.
+        """
+        self._trace.disable()
+        self.trace_path = f"profile_{tick}.prof"
+        self._trace.dump_stats(self.trace_path)
+        self._trace = None
+        return self.trace_path
+
+
+profiler = Profiler()
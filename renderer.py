@@ -0,0 +1,268 @@
+"""
+Renderers that draw the world to the application screen. The full renderer redraws
+the whole screen every frame; the dirty renderer only redraws and pushes the parts of
+the screen that changed. The array renderer draws worlds that have no sprites, and the
+camera renderer draws the part of a world that a Camera can see.
+"""
+
+import numpy as np
+import pygame
+from sidebar import SidebarSprite
+
+FOOD_LAYER = 0
+CRITTER_LAYER = 1
+SIDEBAR_LAYER = 2
+
+
+class FullRenderer:
+    """
+    Fills the screen, draws every sprite group and the sidebar, then flips the display.
+    """
+
+    def __init__(self, screen, groups, sidebar, back_colour):
+        """
+        Constructor for the FullRenderer class.
+        @param screen The display surface.
+        @param groups The sprite groups to draw, from the bottom up.
+        @param sidebar The Sidebar to draw over the sprites.
+        @param back_colour The background colour of the screen.
+        """
+        self.screen = screen
+        self.groups = groups
+        self.sidebar = sidebar
+        self.back_colour = back_colour
+
+    @property
+    def sprite_groups(self) -> tuple:
+        """
+        Read-only: Returns the extra groups that new sprites must join to be drawn.
+        """
+        return ()
+
+    def draw(self, sidebar_values):
+        """
+        Draws a frame and shows it.
+        @param sidebar_values The value for each line of the sidebar.
+        """
+        self.screen.fill(self.back_colour)
+        for group in self.groups:
+            group.draw(self.screen)
+        self.sidebar.draw(self.screen, sidebar_values)
+        pygame.display.flip()
+
+
+class DirtyRenderer:
+    """
+    Draws every sprite through one LayeredDirty group and only pushes the rectangles
+    that changed to the display. Sprites choose their layer through their _layer
+    attribute, and new sprites must join sprite_groups to be drawn.
+    """
+
+    def __init__(self, screen, groups, sidebar, back_colour):
+        """
+        Constructor for the DirtyRenderer class.
+        @param screen The display surface.
+        @param groups The sprite groups whose current sprites should be drawn.
+        @param sidebar The Sidebar to draw over the sprites.
+        @param back_colour The background colour of the screen.
+        """
+        self.screen = screen
+        self.background = pygame.Surface(screen.get_size())
+        self.background.fill(back_colour)
+        self.group = pygame.sprite.LayeredDirty()
+        self.group.clear(screen, self.background)
+        for group in groups:
+            self.group.add(group.sprites())
+        self.sidebar = SidebarSprite(sidebar, SIDEBAR_LAYER)
+        self.group.add(self.sidebar)
+
+        screen.blit(self.background, (0, 0))
+        pygame.display.flip()
+
+    @property
+    def sprite_groups(self) -> tuple:
+        """
+        Read-only: Returns the extra groups that new sprites must join to be drawn.
+        """
+        return (self.group,)
+
+    def draw(self, sidebar_values):
+        """
+        Draws the parts of the frame that changed and pushes only those to the display.
+        @param sidebar_values The value for each line of the sidebar.
+        """
+        self.sidebar.set_values(sidebar_values)
+        pygame.display.update(self.group.draw(self.screen))
+
+
+class ArrayRenderer:
+    """
+    Redraws the whole screen every frame from arrays of positions, sizes and colours
+    rather than from sprites, for worlds that are simulated in other processes.
+    """
+
+    def __init__(self, screen, world, sidebar, back_colour):
+        """
+        Constructor for the ArrayRenderer class.
+        @param screen The display surface.
+        @param world The world to draw. Its food attribute is a list of (x, y, size)
+        arrays and its critters attribute a list of (x, y, size, red, blue) arrays.
+        @param sidebar The Sidebar to draw over the world.
+        @param back_colour The background colour of the screen.
+        """
+        self.screen = screen
+        self.world = world
+        self.sidebar = sidebar
+        self.back_colour = back_colour
+        self.food_colour = (0, 255, 0)
+
+    @property
+    def sprite_groups(self) -> tuple:
+        """
+        Read-only: Returns the extra groups that new sprites must join to be drawn.
+        """
+        return ()
+
+    def draw(self, sidebar_values):
+        """
+        Draws a frame and shows it.
+        @param sidebar_values The value for each line of the sidebar.
+        """
+        fill = self.screen.fill
+        fill(self.back_colour)
+        for xs, ys, sizes in self.world.food:
+            for x, y, size in zip(xs.tolist(), ys.tolist(), sizes.tolist()):
+                fill(self.food_colour, (x, y, size, size))
+        for xs, ys, sizes, reds, blues in self.world.critters:
+            for x, y, size, red, blue in zip(xs.tolist(), ys.tolist(), sizes.tolist(),
+                                             reds.tolist(), blues.tolist()):
+                fill((red, 0, blue), (x, y, size, size))
+        self.sidebar.draw(self.screen, sidebar_values)
+        pygame.display.flip()
+
+
+class CameraRenderer:
+    """
+    Draws the part of the world that a Camera can see, from arrays of positions, sizes
+    and colours as ArrayRenderer does. Only the items inside the visible region are
+    drawn, scaled by the camera's zoom. Below heatmap_zoom individual items would be too
+    small to see, so the visible region is drawn as a heatmap instead: critters and food
+    are counted in bins of heatmap_cell window pixels, and the counts are drawn as the
+    red and green of one small surface that is scaled up to the window.
+    """
+
+    def __init__(self, screen, world, sidebar, back_colour, camera, heatmap_zoom, heatmap_cell):
+        """
+        Constructor for the CameraRenderer class.
+        @param screen The display surface.
+        @param world The world to draw, with food and critters attributes as described
+        for ArrayRenderer.
+        @param sidebar The Sidebar to draw over the world.
+        @param back_colour The background colour of the screen.
+        @param camera The Camera that decides which part of the world is drawn.
+        @param heatmap_zoom The zoom below which the heatmap is drawn.
+        @param heatmap_cell The width and height of each heatmap bin, in window pixels.
+        """
+        self.screen = screen
+        self.world = world
+        self.sidebar = sidebar
+        self.back_colour = back_colour
+        self.camera = camera
+        self.heatmap_zoom = heatmap_zoom
+        self.heatmap_cell = max(1, heatmap_cell)
+        self.food_colour = (0, 255, 0)
+        self.edge_colour = (128, 128, 128)
+
+    @property
+    def sprite_groups(self) -> tuple:
+        """
+        Read-only: Returns the extra groups that new sprites must join to be drawn.
+        """
+        return ()
+
+    def draw(self, sidebar_values):
+        """
+        Draws a frame and shows it.
+        @param sidebar_values The value for each line of the sidebar.
+        """
+        self.screen.fill(self.back_colour)
+        if self.camera.zoom < self.heatmap_zoom:
+            self.draw_heatmap()
+        else:
+            self.draw_items()
+        self.draw_edges()
+        self.sidebar.draw(self.screen, sidebar_values)
+        pygame.display.flip()
+
+    def draw_items(self):
+        """
+        Draws every item of food and every critter that overlaps the visible region.
+        """
+        left, top, width, height = self.camera.visible_rect()
+        zoom = self.camera.zoom
+        fill = self.screen.fill
+
+        def visible(xs, ys, sizes):
+            # The items that overlap the visible region, in window coordinates.
+            inside = (xs + sizes > left) & (xs < left + width) & (ys + sizes > top) & (ys < top + height)
+            return (
+                inside,
+                ((xs[inside] - left) * zoom).astype(np.int64).tolist(),
+                ((ys[inside] - top) * zoom).astype(np.int64).tolist(),
+                np.maximum(sizes[inside] * zoom, 1).astype(np.int64).tolist(),
+            )
+
+        for xs, ys, sizes in self.world.food:
+            _, xs, ys, sizes = visible(xs, ys, sizes)
+            for x, y, size in zip(xs, ys, sizes):
+                fill(self.food_colour, (x, y, size, size))
+        for xs, ys, sizes, reds, blues in self.world.critters:
+            inside, xs, ys, sizes = visible(xs, ys, sizes)
+            for x, y, size, red, blue in zip(xs, ys, sizes, reds[inside].tolist(),
+                                             blues[inside].tolist()):
+                fill((red, 0, blue), (x, y, size, size))
+
+    def draw_heatmap(self):
+        """
+        Draws the density of critters and food in the visible region.
+        """
+        left, top, width, height = self.camera.visible_rect()
+        columns = max(1, self.screen.get_width() // self.heatmap_cell)
+        rows = max(1, self.screen.get_height() // self.heatmap_cell)
+
+        def density(arrays):
+            # The number of items centred in each bin, scaled to 0-255 by square root
+            # so that sparse bins are still visible next to crowded ones.
+            counts = np.zeros(columns * rows, dtype=np.int64)
+            for xs, ys, sizes, *_ in arrays:
+                column = np.floor((xs + sizes / 2 - left) * (columns / width)).astype(np.int64)
+                row = np.floor((ys + sizes / 2 - top) * (rows / height)).astype(np.int64)
+                inside = (column >= 0) & (column < columns) & (row >= 0) & (row < rows)
+                counts += np.bincount(column[inside] * rows + row[inside], minlength=columns * rows)
+            peak = counts.max()
+            if peak == 0:
+                return counts.reshape(columns, rows).astype(np.uint8)
+            return (np.sqrt(counts / peak) * 255).astype(np.uint8).reshape(columns, rows)
+
+        pixels = np.zeros((columns, rows, 3), dtype=np.uint8)
+        pixels[:, :, 0] = density(self.world.critters)
+        pixels[:, :, 1] = density(self.world.food)
+        heatmap = pygame.surfarray.make_surface(pixels)
+        # Empty bins show the background.
+        heatmap.set_colorkey((0, 0, 0))
+        self.screen.blit(pygame.transform.scale(heatmap, (columns * self.heatmap_cell,
+                                                          rows * self.heatmap_cell)), (0, 0))
+
+    def draw_edges(self):
+        """
+        Outlines the edges of the world.
+        """
+        left, top, _, _ = self.camera.visible_rect()
+        zoom = self.camera.zoom
+        pygame.draw.rect(self.screen, self.edge_colour, (
+            int(-left * zoom), int(-top * zoom),
+            int(self.camera.world_width * zoom), int(self.camera.world_height * zoom),
+        ), 1)
+
+
+RENDERERS = {"full": FullRenderer, "dirty": DirtyRenderer}
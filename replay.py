@@ -0,0 +1,50 @@
+"""
+Replays a binary event log written by the simulation (see event_log.py), reporting how
+the population changed over the run without simulating it again.
+"""
+
+import argparse
+import sys
+from event_log import read_log, replay, first_difference
+
+
+def main(argv):
+    """
+    Prints a summary of an event log, and optionally compares it with another log.
+    @param argv The command line arguments, excluding the program name.
+    """
+    parser = argparse.ArgumentParser(description="Replay a critter event log.")
+    parser.add_argument("log", help="The event log to replay.")
+    parser.add_argument(
+        "--every", type=int, default=1000, help="Ticks between rows of the report."
+    )
+    parser.add_argument(
+        "--compare", metavar="LOG", help="Another event log that should contain the same events."
+    )
+    args = parser.parse_args(argv)
+
+    header, records = read_log(args.log)
+    history = replay(records)
+    print(
+        f"Seed {header['seed']}, world {header['width']}x{header['height']}, "
+        f"{len(records)} events over {len(history['critters'])} ticks"
+    )
+    print(f"{'tick':>10} {'critters':>10} {'food':>10}")
+    for tick in range(0, len(history["critters"]), max(1, args.every)):
+        print(f"{tick:>10} {history['critters'][tick]:>10} {history['food'][tick]:>10}")
+    for name in ("births", "died_of_old_age", "died_of_no_energy", "matings", "food_eaten"):
+        print(f"{name}: {int(history[name].sum())}")
+
+    if args.compare:
+        _, other_records = read_log(args.compare)
+        difference = first_difference(records, other_records)
+        if difference is None:
+            print(f"{args.compare} contains the same events.")
+        else:
+            print(f"Runs differ from event {difference} onwards.")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,89 @@
+"""
+Reproduction. Offspring inherit each gene from one parent or the other, with occasional
+mutation, and births are queued during a tick and created together when it ends, so
+that no group of critters changes while it is being updated.
+"""
+
+import numpy as np
+from config import config
+from rng import rng
+from tick_counters import tick_counters
+
+
+def can_mate_at(age) -> bool:
+    """
+    Returns True if a critter of the given age is old enough, and young enough, to mate.
+    """
+    return config.critter_min_mating_age <= age <= config.critter_max_mating_age
+
+
+def crossover(genes_a, genes_b) -> dict:
+    """
+    Returns the genes of a child of two critters. Each gene is taken from either parent
+    with equal chance and then mutated with probability critter_mutation_rate, by a
+    normally distributed amount. Genes stay between -1 and 1.
+    @param genes_a, genes_b The genes of the parents.
+    """
+    child = {}
+    for name, value in genes_a.items():
+        if rng.random() < 0.5:
+            value = genes_b[name]
+        if rng.random() < config.critter_mutation_rate:
+            value += rng.gauss(0.0, config.critter_mutation_scale)
+        child[name] = min(1.0, max(-1.0, value))
+    return child
+
+
+def crossover_arrays(genes_a, genes_b, generator):
+    """
+    The same as crossover for many pairs of parents at once.
+    @param genes_a, genes_b Arrays with one row of genes for each parent.
+    @param generator The NumPy random generator to use.
+    @return An array with one row of genes for each child.
+    """
+    child = np.where(generator.random(genes_a.shape) < 0.5, genes_b, genes_a)
+    mutate = generator.random(child.shape) < config.critter_mutation_rate
+    child = child + mutate * generator.normal(0.0, config.critter_mutation_scale, child.shape)
+    return np.clip(child, -1.0, 1.0)
+
+
+class BirthQueue:
+    """
+    Holds the critters conceived during a tick until they are created at its end.
+    """
+
+    def __init__(self):
+        """
+        Constructor for the BirthQueue class.
+        """
+        self.pending = []
+
+    def __len__(self):
+        return len(self.pending)
+
+    def add(self, x, y, genes, parents):
+        """
+        Queues a birth.
+        @param x, y The centre of the new critter.
+        @param genes The genes of the new critter.
+        @param parents The ids of the new critter's two parents.
+        """
+        self.pending.append((x, y, genes, parents))
+
+    def take(self, room):
+        """
+        Returns the queued births, in the order they were conceived, and empties the
+        queue. Births beyond room are dropped and counted, so that the population cannot
+        grow beyond its cap.
+        @param room The number of critters that can still be added.
+        """
+        pending = self.pending
+        self.pending = []
+        room = max(0, room)
+        if len(pending) > room:
+            tick_counters.count("births dropped", len(pending) - room)
+            return pending[:room]
+        return pending
+
+
+births = BirthQueue()
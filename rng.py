@@ -0,0 +1,20 @@
+'''
+The random number generator shared by the whole simulation. Everything that needs a
+random value draws it from here rather than from the global random module, so that
+seeding this one generator makes a run reproducible.
+'''
+import random
+
+rng = random.Random()
+
+
+def seed_simulation(seed: int) -> int:
+    '''
+    Seeds the simulation's random number generator.
+    @param seed The seed to use, or a negative number to pick one at random.
+    @return The seed that was used, so that it can be logged and the run repeated.
+    '''
+    if seed < 0:
+        seed = random.SystemRandom().randrange(2**32)
+    rng.seed(seed)
+    return seed
@@ -0,0 +1,344 @@
+"""
+A world split into vertical strips, each simulated by its own worker process. Every
+worker owns the critters whose centres lie in its strip and the food that was spawned
+there, and runs a CritterEngine over them. The main process only routes data between
+the workers and gathers positions and colours when a frame is to be drawn.
+
+Each update is a single round trip to every worker. Critters within reach of a strip
+boundary are copied to the neighbouring strip as halo critters, so that they can eat
+the neighbour's food and mate with its critters. Halo copies are taken at the end of
+the previous update and moved on by one step, and what happens to them (energy gained,
+mating) is sent back to their owner and applied at the start of the next update. This
+keeps the workers independent within an update at the cost of some approximations:
+a critter near a boundary may eat once on each side, or mate on both sides, in the
+same update, and an effect is lost if its critter dies or changes strip first.
+"""
+
+import multiprocessing
+import numpy as np
+from config import config
+from creature_sprite import CritterSprite
+from critter_engine import CritterEngine, FoodArrays
+from food_growth import PatchGrid
+from rng import rng
+from tick_counters import tick_counters
+
+
+def halo_margin() -> float:
+    """
+    Returns the distance from a strip boundary within which a critter may eat food or
+    find a mate on the other side of it.
+    """
+    return (max(config.critter_max_size, config.critter_mating_distance)
+            + config.critter_max_speed + 1)
+
+
+def strip_of(x, strips):
+    """
+    Returns the strip that contains each x coordinate, clamped to the world.
+    @param x An array of x coordinates.
+    @param strips The number of strips the world is divided into.
+    """
+    strip = (np.asarray(x) * strips // config.screen_width).astype(np.int64)
+    return np.clip(strip, 0, strips - 1)
+
+
+class Shard:
+    """
+    The part of the world simulated by one worker process.
+    """
+
+    def __init__(self, index, strips, seed):
+        """
+        Constructor for the Shard class.
+        @param index The strip that this shard owns, counting from the left.
+        @param strips The number of strips the world is divided into.
+        @param seed The seed for this shard's random number generators.
+        """
+        rng.seed(seed)
+        self.index = index
+        self.strips = strips
+        self.left = index * config.screen_width / strips
+        self.right = (index + 1) * config.screen_width / strips
+        self.margin = halo_margin()
+        # Ids are interleaved between shards so that they stay unique.
+        self.engine = CritterEngine(None, id_start=index + 1, id_step=strips)
+        # Each shard takes an equal part of the population cap, so the cap only holds
+        # approximately as critters move between shards.
+        self.engine.max_population = max(1, config.critter_max_population // strips)
+        self.food = FoodArrays()
+        self.patches = PatchGrid.from_config()
+
+    def centres(self, start=0):
+        """
+        Returns the x coordinate of the centre of each local critter from start onwards.
+        """
+        engine = self.engine
+        return engine.x[start: engine.count] + np.trunc(engine.size[start: engine.count]) // 2
+
+    def apply(self, message):
+        """
+        Applies what the main process and the other shards sent since the last update.
+        """
+        engine = self.engine
+        for state in message["migrants"]:
+            engine.import_state(state)
+        for x, y, genes in message["births"]:
+            engine.add(x, y, genes)
+        self.food.add(*message["food"])
+
+        ids = engine.ids[: engine.count]
+        for effect_ids, energy_gained, mated in message["effects"]:
+            index = np.flatnonzero(np.isin(ids, effect_ids))
+            order = np.searchsorted(effect_ids, ids[index])
+            engine.energy[index] = np.minimum(
+                engine.energy[index] + energy_gained[order], config.critter_max_energy
+            )
+            mated_index = index[mated[order]]
+            engine.last_mating_time[mated_index] = np.maximum(
+                engine.last_mating_time[mated_index], message["update_count"] - 1
+            )
+
+    def step(self, message) -> dict:
+        """
+        Runs one update of this shard.
+        @param message The data sent by the main process for this update.
+        @return The data for the main process to route to other shards or draw.
+        """
+        self.apply(message)
+        engine = self.engine
+        update_count = message["update_count"]
+
+        local = engine.count
+        if local:
+            # Critters only sense the food in their own shard.
+            engine.steer(self.food)
+            engine.move()
+
+        # Halo critters from the right are mating candidates; those from the left are
+        # not, because the shard on the left decides matings across a boundary.
+        right_halo, left_halo = message["halo_right"], message["halo_left"]
+        engine.import_state(right_halo)
+        candidates = engine.count
+        engine.import_state(left_halo)
+        energy_before = engine.energy[local: engine.count].copy()
+        mated_before = engine.last_mating_time[local: engine.count].copy()
+
+        engine.eat(self.food)
+        engine.mate(update_count, candidates=candidates, local=local)
+
+        effects = {}
+        right_count = len(right_halo["ids"])
+        for side, start, stop in (("right", local, local + right_count),
+                                  ("left", local + right_count, engine.count)):
+            before = slice(start - local, stop - local)
+            gained = engine.energy[start:stop] - energy_before[before]
+            mated = engine.last_mating_time[start:stop] != mated_before[before]
+            changed = (gained != 0) | mated
+            ids = engine.ids[start:stop][changed]
+            order = np.argsort(ids)
+            effects[side] = (ids[order], gained[changed][order], mated[changed][order])
+        engine.truncate(local)
+
+        if engine.count:
+            engine.age_and_die()
+        # Children of critters on either side of a boundary are born in the shard that
+        # decided the mating, and move to the right shard like any other critter.
+        engine.add_births()
+
+        # Critters whose centres have left the strip move to the neighbouring shard.
+        centre = self.centres()
+        strip = strip_of(centre, self.strips)
+        leaving = strip != self.index
+        emigrants = {}
+        if leaving.any():
+            for target in np.unique(strip[leaving]).tolist():
+                emigrants[target] = engine.export_state(np.flatnonzero(strip == target))
+            engine.remove(leaving)
+            centre = self.centres()
+
+        # Halo copies are moved on by one step to approximate where they will be when
+        # the neighbour next uses them.
+        halos = {}
+        for side, near in (("left", centre < self.left + self.margin),
+                           ("right", centre >= self.right - self.margin)):
+            state = engine.export_state(np.flatnonzero(near))
+            state["x"] = state["x"] + state["speed"] * np.cos(state["angle"])
+            state["y"] = state["y"] + state["speed"] * np.sin(state["angle"])
+            halos[side] = state
+
+        n = engine.count
+        result = {
+            "emigrants": emigrants,
+            "halo_left": halos["left"],
+            "halo_right": halos["right"],
+            "effects": effects,
+            "count": n,
+            "total_age": engine.total_age,
+            "oldest_age": engine.oldest_age,
+            "food_count": len(self.food),
+            "food_patches": self.patches.occupancy(self.food.x + self.food.size // 2,
+                                                   self.food.y + self.food.size // 2),
+            "died_of_old_age": CritterSprite.died_of_old_age,
+            "died_of_no_energy": CritterSprite.died_of_no_energy,
+            # Counted here but logged by the main process, with every other shard's counts.
+            "tick_counts": tick_counters.take(),
+        }
+        if message["gather"]:
+            result["critters"] = (
+                engine.x[:n].astype(np.int32),
+                engine.y[:n].astype(np.int32),
+                np.trunc(engine.size[:n]).astype(np.int32),
+                engine.red[:n].copy(),
+                engine.blue[:n].copy(),
+            )
+            result["food"] = (
+                self.food.x.astype(np.int32),
+                self.food.y.astype(np.int32),
+                self.food.size.astype(np.int32),
+            )
+        return result
+
+
+def run_shard(connection, index, strips, seed):
+    """
+    The main loop of a worker process. Each message received is one update, and None
+    asks the worker to stop.
+    """
+    shard = Shard(index, strips, seed)
+    while True:
+        message = connection.recv()
+        if message is None:
+            break
+        connection.send(shard.step(message))
+    connection.close()
+
+
+class ShardedWorld:
+    """
+    Runs the critters and food in a pool of worker processes, one per strip of the
+    world, and presents the same population statistics as a CritterEngine.
+    """
+
+    def __init__(self, workers):
+        """
+        Constructor for the ShardedWorld class. The worker processes are started
+        immediately.
+        @param workers The number of worker processes, and so of strips.
+        """
+        self.strips = workers
+        self.count = 0
+        self.total_age = 0
+        self.oldest_age = 0
+        self.food_count = 0
+        self.food_patches = np.zeros(PatchGrid.from_config().count, dtype=np.int64)
+        self.next_food_id = 1
+        # When set, each update gathers what is needed to draw a frame.
+        self.gather = False
+        self.critters = []
+        self.food = []
+
+        self._empty = {name: np.zeros((0,) + shape, dtype=dtype)
+                       for name, (dtype, shape) in CritterEngine.FIELDS.items()}
+        self._pending = [self._empty_message(self._empty) for _ in range(workers)]
+
+        # Workers are started fresh rather than forked, so that they do not inherit the
+        # display or any other state of the main process.
+        context = multiprocessing.get_context("spawn")
+        self.connections = []
+        self.processes = []
+        for index in range(workers):
+            parent, child = context.Pipe()
+            process = context.Process(
+                target=run_shard, args=(child, index, workers, rng.getrandbits(64)), daemon=True
+            )
+            process.start()
+            child.close()
+            self.connections.append(parent)
+            self.processes.append(process)
+
+    @staticmethod
+    def _empty_message(empty_state) -> dict:
+        return {
+            "migrants": [],
+            "births": [],
+            "food": ([], [], [], []),
+            "effects": [],
+            "halo_left": empty_state,
+            "halo_right": empty_state,
+        }
+
+    @property
+    def average_age(self) -> int:
+        """
+        Read-only: Returns the average age of the living critters, rounded down.
+        """
+        return self.total_age // self.count if self.count else 0
+
+    def add(self, x, y, genes):
+        """
+        Adds a critter centred on (x, y) to the shard that owns that position. It is
+        created at the start of the next update.
+        """
+        strip = int(strip_of(x, self.strips))
+        self._pending[strip]["births"].append((x, y, genes))
+
+    def add_food(self, x, y, size):
+        """
+        Adds an item of food centred on (x, y) to the shard that owns that position, at
+        the start of the next update.
+        """
+        food = self._pending[int(strip_of(x, self.strips))]["food"]
+        corner = size // 2
+        for values, value in zip(food, (x - corner, y - corner, size, self.next_food_id)):
+            values.append(value)
+        self.next_food_id += 1
+
+    def step(self, update_count):
+        """
+        Runs one update in every shard and routes the results between them.
+        @param update_count The number of updates that have taken place so far.
+        """
+        for connection, message in zip(self.connections, self._pending):
+            message["update_count"] = update_count
+            message["gather"] = self.gather
+            message["food"] = tuple(np.asarray(values, dtype=dtype) for values, dtype in
+                                    zip(message["food"],
+                                        (np.float64, np.float64, np.float64, np.int64)))
+            connection.send(message)
+        results = [connection.recv() for connection in self.connections]
+
+        self._pending = [self._empty_message(self._empty) for _ in range(self.strips)]
+        for index, result in enumerate(results):
+            for target, state in result["emigrants"].items():
+                self._pending[target]["migrants"].append(state)
+            if index > 0:
+                self._pending[index - 1]["halo_right"] = result["halo_left"]
+                self._pending[index - 1]["effects"].append(result["effects"]["left"])
+            if index < self.strips - 1:
+                self._pending[index + 1]["halo_left"] = result["halo_right"]
+                self._pending[index + 1]["effects"].append(result["effects"]["right"])
+
+        self.count = sum(result["count"] for result in results)
+        self.total_age = sum(result["total_age"] for result in results)
+        self.oldest_age = max(result["oldest_age"] for result in results)
+        self.food_count = sum(result["food_count"] for result in results)
+        self.food_patches = sum(result["food_patches"] for result in results)
+        CritterSprite.died_of_old_age = sum(result["died_of_old_age"] for result in results)
+        CritterSprite.died_of_no_energy = sum(result["died_of_no_energy"] for result in results)
+        for result in results:
+            for name, amount in result["tick_counts"].items():
+                tick_counters.count(name, amount)
+        if self.gather:
+            self.critters = [result["critters"] for result in results]
+            self.food = [result["food"] for result in results]
+
+    def close(self):
+        """
+        Stops the worker processes.
+        """
+        for connection in self.connections:
+            connection.send(None)
+            connection.close()
+        for process in self.processes:
+            process.join()
@@ -0,0 +1,109 @@
+"""
+The informational sidebar drawn on the left hand side of the application screen.
+"""
+
+import pygame
+
+LINE_HEIGHT = 30
+FIRST_LINE = 100
+TEXT_COLOUR = (255, 255, 255)
+
+
+class Sidebar:
+    """
+    Draws a translucent panel with one line of text per statistic. The font is loaded
+    once, each line's label is rendered once, and a value is only rendered again when
+    it changes. The background surface is created once and reused every frame.
+    """
+
+    def __init__(self, labels, width, height, colour, opacity):
+        """
+        Constructor for the Sidebar class. Requires pygame.font to be initialised.
+        @param labels The label for each line of the sidebar, for example "Critters: ".
+        @param width, height The size of the sidebar.
+        @param colour The background colour of the sidebar.
+        @param opacity The opacity of the background, from 0 to 255.
+        """
+        self.font = pygame.font.Font(None, 24)
+        self.size = (width, height)
+        self.colour = colour
+        self.opacity = opacity
+        self.background = pygame.Surface((width, height))
+        self.background.set_alpha(opacity)
+        self.background.fill(colour)
+        self.labels = [self.font.render(label, True, TEXT_COLOUR) for label in labels]
+        self._values = [None] * len(labels)
+        self._value_surfaces = [None] * len(labels)
+
+    def set_values(self, values) -> bool:
+        """
+        Renders any values that have changed since the last call.
+        @param values The value for each line of the sidebar, in the same order as the labels.
+        @return True if any value changed.
+        """
+        changed = False
+        for line, value in enumerate(values):
+            if value != self._values[line]:
+                self._values[line] = value
+                self._value_surfaces[line] = self.font.render(str(value), True, TEXT_COLOUR)
+                changed = True
+        return changed
+
+    def draw_text(self, scr):
+        """
+        Draws the labels and their current values.
+        @param scr The surface to draw on, with the sidebar at its top left corner.
+        """
+        for line, (label, value) in enumerate(zip(self.labels, self._value_surfaces)):
+            line_pos = line * LINE_HEIGHT + FIRST_LINE
+            scr.blit(label, (10, line_pos))
+            if value is not None:
+                scr.blit(value, (10 + label.get_width(), line_pos))
+
+    def draw(self, scr, values):
+        """
+        Draws the sidebar.
+        @param scr A reference to the main application screen.
+        @param values The value for each line of the sidebar, in the same order as the labels.
+        """
+        self.set_values(values)
+        scr.blit(self.background, (0, 0))
+        self.draw_text(scr)
+
+
+class SidebarSprite(pygame.sprite.DirtySprite):
+    """
+    The sidebar as a sprite for dirty rectangle rendering. The panel and its text are
+    composed into one translucent image, which is only redrawn, and only marked dirty,
+    when a value changes. Sprites that move underneath it are blended with it by the
+    LayeredDirty group that draws it.
+    """
+
+    def __init__(self, sidebar, layer):
+        """
+        Constructor for the SidebarSprite class.
+        @param sidebar The Sidebar to draw.
+        @param layer The layer to draw the sidebar on, above every other sprite.
+        """
+        self._layer = layer
+        super().__init__()
+        self.sidebar = sidebar
+        self.image = pygame.Surface(sidebar.size, pygame.SRCALPHA)
+        self.rect = self.image.get_rect()
+        self._compose()
+
+    def _compose(self):
+        """
+        Redraws the panel and text into the sprite's image.
+        """
+        self.image.fill((*self.sidebar.colour, self.sidebar.opacity))
+        self.sidebar.draw_text(self.image)
+        self.dirty = 1
+
+    def set_values(self, values):
+        """
+        Updates the sidebar's values, redrawing it if any of them changed.
+        @param values The value for each line of the sidebar, in the same order as the labels.
+        """
+        if self.sidebar.set_values(values):
+            self._compose()
@@ -0,0 +1,750 @@
+"""
+The simulation: the world of critters and food, the update that advances it, and the
+loops that run it with or without a window. Nothing in pygame beyond its sprite classes
+is used until a renderer is attached, so headless runs start without a display.
+"""
+
+# pylint: disable=E1101
+import threading
+import time
+import numpy as np
+import pygame
+from camera import Camera
+from checkpoint import CheckpointWriter
+from config import config
+from creature_sprite import CritterSprite, GENE_NAMES
+from creature_sprite import UpdateMethod
+from critter_engine import CritterEngine, SpriteFood
+from event_log import events
+from food_growth import FoodGrowth
+from food_sprite import FoodSprite
+from lineage import lineage
+from metrics import MetricsRecorder
+from population_stats import CritterGroup
+from profiler import profiler
+from renderer import RENDERERS, ArrayRenderer, CameraRenderer
+from reproduction import births
+from rng import rng, seed_simulation
+from sharded_world import ShardedWorld
+from sidebar import Sidebar
+from snapshot import SnapshotBuffer
+from spatial_grid import SpatialGrid, SpatialGroup
+from tick_counters import tick_counters
+
+log = config.logger
+SPAWN_BUFFER = config.spawn_buffer_size
+
+SIDEBAR_LABELS = (
+    "Current critter count: ",
+    "Average critter's age: ",
+    "Oldest critter's age: ",
+    "Critters died from no energy: ",
+    "Critters died from old age: ",
+)
+
+
+class Simulation:
+    """
+    Holds the whole simulated world and advances it one update at a time. A new
+    simulation is empty until populate() or restore_state() is called, and runs
+    headless until attach_renderer() opens a window for it.
+    """
+
+    def __init__(self, engine="sprite", workers=0, seed=-1, event_log="", checkpoint="",
+                 checkpoint_interval=0, metrics="", lineage_file=""):
+        """
+        Constructor for the Simulation class. Seeds the random number generators.
+        @param engine Update critters one sprite at a time ("sprite"), or all at once
+        with NumPy arrays ("numpy").
+        @param workers The number of processes to split the world between, or 0 to
+        simulate it in this process.
+        @param seed The random seed, or a negative number to pick one at random.
+        @param event_log The file to record events in for replay.py, or empty for none.
+        @param checkpoint The file to write checkpoints to, or empty for none.
+        @param checkpoint_interval The number of updates between checkpoints, or 0 to
+        only write one when the simulation is closed.
+        @param metrics The CSV file to append population metrics to, or empty for none.
+        @param lineage_file The file to write every critter's parents and genes to when
+        the simulation is closed, or empty for none.
+        """
+        self.update_count = 0
+        self.renderer = None
+        # Set when the simulation runs on its own thread and the renderer draws snapshots.
+        self.snapshots = None
+        # Set when the renderer shows the world through a camera.
+        self.camera = None
+        # Extra groups that new sprites join so that the renderer draws them.
+        self.render_groups = ()
+
+        self.seed = seed_simulation(seed)
+        log.info(f"Simulation seed: {self.seed}")
+        # Decides where food grows.
+        self.food_growth = FoodGrowth.from_config(np.random.default_rng(rng.getrandbits(64)))
+        if event_log and workers:
+            log.warning("Events are not logged when the world is split between workers")
+        elif event_log:
+            events.open(event_log, self.seed, config.screen_width, config.screen_height)
+        # Set when the lineage of every critter is recorded and written on closing.
+        self.lineage_file = ""
+        if lineage_file and workers:
+            log.warning("Lineage is not recorded when the world is split between workers")
+        elif lineage_file:
+            self.lineage_file = lineage_file
+            lineage.start(GENE_NAMES, config.lineage_gene_bins, config.lineage_history_interval)
+
+        if engine == "numpy":
+            # The engine keeps its own population statistics, so its views go in a plain group.
+            self.critters_group = pygame.sprite.Group()
+        else:
+            self.critters_group = CritterGroup()
+        # Food never moves, so it is indexed once when added and dropped from the index on
+        # kill(). No food or critter is larger than the maximum critter size, so each rect
+        # spans at most four cells.
+        self.food_group = SpatialGroup(config.critter_max_size)
+        # Critters move up to max_speed pixels between the grid being rebuilt and a mate
+        # query, so the cells are sized to cover the mating distance plus that much movement.
+        self.mating_grid = SpatialGrid(config.critter_mating_distance + config.critter_max_speed + 2)
+        self.movement = UpdateMethod[config.critter_movement.upper()]
+        # Critters seeking food measure from their centre to the food's, but the grid
+        # holds the top left corners, so the cells also cover the largest sprite.
+        self.food_grid = SpatialGrid(config.critter_sensing_radius + config.critter_max_size + 2)
+
+        # Set when checkpoints are to be written every checkpoint_interval updates.
+        self.checkpoint_writer = None
+        self.checkpoint_interval = 0
+        if workers and checkpoint:
+            log.warning("Checkpoints are not supported when the world is split between workers")
+        elif checkpoint:
+            self.checkpoint_writer = CheckpointWriter(checkpoint, log)
+            self.checkpoint_interval = checkpoint_interval
+
+        # Set when population metrics are sampled every config.metrics_interval updates.
+        self.metrics_recorder = None
+        if metrics:
+            self.metrics_recorder = MetricsRecorder(
+                metrics, config.metrics_energy_bins, config.critter_max_energy,
+                config.metrics_buffer_size, config.metrics_batch_size,
+            )
+
+        # Set when the world is split between worker processes, in which case neither
+        # food nor critters have sprites in this process.
+        self.sharded_world = ShardedWorld(workers) if workers else None
+
+        # Set when the vectorised engine is selected, in which case critters_group only
+        # holds views of the critters for drawing.
+        self.critter_engine = None
+        if engine == "numpy" and self.sharded_world is None:
+            self.critter_engine = CritterEngine(None, config.critter_initial_count)
+
+    def attach_renderer(self, mode, pipelined=False):
+        """
+        Initialises pygame's display and fonts, opens the application window and creates
+        the renderer that draws into it. Critters and food that already exist are drawn
+        as well as those created later.
+        @param mode The name of the renderer to use, one of the keys of RENDERERS, or
+        "camera" to show part of the world through a Camera in a smaller window.
+        @param pipelined If True, run() simulates on its own thread and the renderer
+        draws snapshots of the world. Snapshots hold no sprites, so the full and dirty
+        renderers are replaced by an ArrayRenderer.
+        """
+        pygame.init()
+        pygame.font.init()
+        if mode == "camera":
+            window_size = (config.render_window_width, config.render_window_height)
+        else:
+            window_size = (config.screen_width, config.screen_height)
+        screen = pygame.display.set_mode(
+            window_size,
+            flags=pygame.HWSURFACE | pygame.DOUBLEBUF,
+            vsync=1,
+        )
+        sidebar = Sidebar(
+            self.sidebar_labels(),
+            config.sidebar_width,
+            window_size[1],
+            config.sidebar_colour,
+            config.sidebar_opacity,
+        )
+        if self.sharded_world is not None:
+            self.sharded_world.gather = True
+        # The world that array based renderers draw from.
+        world = self
+        if pipelined:
+            self.snapshots = world = SnapshotBuffer(max(config.critter_initial_count,
+                                                        config.food_initial_count))
+        elif self.sharded_world is not None:
+            world = self.sharded_world
+
+        if mode == "camera":
+            self.camera = Camera(config.screen_width, config.screen_height, *window_size)
+            # Hold an arrow key to keep panning.
+            pygame.key.set_repeat(250, 30)
+            self.renderer = CameraRenderer(screen, world, sidebar, config.screen_back_colour,
+                                           self.camera, config.render_heatmap_zoom,
+                                           config.render_heatmap_cell)
+        elif pipelined or self.sharded_world is not None:
+            self.renderer = ArrayRenderer(screen, world, sidebar, config.screen_back_colour)
+        else:
+            self.renderer = RENDERERS[mode](
+                screen, (self.food_group, self.critters_group), sidebar, config.screen_back_colour
+            )
+        self.render_groups = self.renderer.sprite_groups
+        if self.critter_engine is not None and mode != "camera" and not pipelined:
+            # Views are only needed when the renderer draws sprites.
+            self.critter_engine.attach_views((self.critters_group, *self.render_groups))
+
+    @property
+    def food(self) -> list:
+        """
+        Read-only: Returns the food as a list of (x, y, size) arrays, giving the top left
+        corner and width of each item, for renderers that draw from arrays.
+        """
+        if self.sharded_world is not None:
+            return self.sharded_world.food
+        foods = self.food_group.sprites()
+        count = len(foods)
+        return [(
+            np.fromiter((food.rect.x for food in foods), np.float64, count),
+            np.fromiter((food.rect.y for food in foods), np.float64, count),
+            np.fromiter((food.rect.width for food in foods), np.float64, count),
+        )]
+
+    @property
+    def critters(self) -> list:
+        """
+        Read-only: Returns the critters as a list of (x, y, size, red, blue) arrays,
+        giving the top left corner, width and colour of each critter, for renderers that
+        draw from arrays.
+        """
+        if self.sharded_world is not None:
+            return self.sharded_world.critters
+        engine = self.critter_engine
+        if engine is not None:
+            count = engine.count
+            return [(engine.x[:count], engine.y[:count], np.trunc(engine.size[:count]),
+                     engine.red[:count], engine.blue[:count])]
+        critters = self.critters_group.sprites()
+        count = len(critters)
+        return [(
+            np.fromiter((critter.x for critter in critters), np.float64, count),
+            np.fromiter((critter.y for critter in critters), np.float64, count),
+            np.fromiter((critter.rect.width for critter in critters), np.float64, count),
+            np.fromiter((critter.colour[0] for critter in critters), np.uint8, count),
+            np.fromiter((critter.colour[2] for critter in critters), np.uint8, count),
+        )]
+
+    def food_occupancy(self):
+        """
+        Returns the number of items of food in each patch of the food growth grid.
+        """
+        if self.sharded_world is not None:
+            return self.sharded_world.food_patches
+        foods = self.food_group.sprites()
+        x_pos = np.fromiter((food.rect.centerx for food in foods), np.int64, len(foods))
+        y_pos = np.fromiter((food.rect.centery for food in foods), np.int64, len(foods))
+        return self.food_growth.grid.occupancy(x_pos, y_pos)
+
+    def create_food(self, count: int):
+        """
+        Create food for the environment. Up to count food items are created in one batch,
+        placed by food_growth according to the fertility and remaining capacity of each
+        patch, and sized according to the food config. All food items exist in the
+        food_group.
+        This is done once when the simulation is populated, and then periodically by
+        spawn_food.
+        """
+        x_positions, y_positions, sizes = self.food_growth.plan(count, self.food_occupancy())
+        for x_pos, y_pos, size in zip(x_positions.tolist(), y_positions.tolist(), sizes.tolist()):
+            if self.sharded_world is not None:
+                self.sharded_world.add_food(x_pos, y_pos, size)
+            else:
+                food = FoodSprite.create(x_pos, y_pos, size)
+                food.add(self.food_group, self.render_groups)
+
+    def create_initial_critters(self, count: int):
+        """
+        Create initial critters for the environment. This is only done once when the
+        simulation is populated. After this, critters can die from zero energy or old
+        age. New critters are created through mating.
+        """
+        for _ in range(count):
+            x_pos = rng.randint((0 + SPAWN_BUFFER), (config.screen_width - SPAWN_BUFFER))
+            y_pos = rng.randint(
+                (0 + SPAWN_BUFFER), (config.screen_height - SPAWN_BUFFER)
+            )
+
+            energy, size, speed = get_initial_critter_values()
+
+            # Create genes based on the initial critter values that are generated above.
+            genes = {
+                "size": (size - config.critter_min_size)
+                / (config.critter_max_size - config.critter_min_size)
+                * 2
+                - 1,
+                "speed": (speed - config.critter_min_speed)
+                / (config.critter_max_speed - config.critter_min_speed)
+                * 2
+                - 1,
+                "energy": (energy - config.critter_min_energy)
+                / (config.critter_max_energy - config.critter_min_energy)
+                * 2
+                - 1,
+                # ... add other genes as required
+            }
+
+            if self.sharded_world is not None:
+                self.sharded_world.add(x_pos, y_pos, genes)
+            elif self.critter_engine is not None:
+                self.critter_engine.add(x_pos, y_pos, genes)
+            else:
+                critter = CritterSprite.create(x_pos, y_pos, genes)
+                critter.add(self.critters_group, self.render_groups)
+
+    def populate(self, food_count=None, critter_count=None):
+        """
+        Creates the initial food and critters.
+        @param food_count, critter_count The numbers to create, by default those in the
+        application config.
+        """
+        self.create_food(config.food_initial_count if food_count is None else food_count)
+        self.create_initial_critters(
+            config.critter_initial_count if critter_count is None else critter_count
+        )
+
+    def population_stats(self):
+        """
+        Returns the running population statistics of whichever engine is in use. Both
+        provide count, average_age and oldest_age without scanning every critter.
+        """
+        if self.sharded_world is not None:
+            return self.sharded_world
+        if self.critter_engine is not None:
+            return self.critter_engine
+        return self.critters_group.stats
+
+    def sidebar_labels(self):
+        """
+        Returns the label for each line of the sidebar.
+        """
+        if show_profile_panel():
+            return SIDEBAR_LABELS + profiler.panel_labels()
+        return SIDEBAR_LABELS
+
+    def sidebar_values(self):
+        """
+        Returns the value for each line of the sidebar, in the order of sidebar_labels().
+        """
+        stats = self.population_stats()
+        values = (
+            stats.count,
+            stats.average_age,
+            stats.oldest_age,
+            CritterSprite.died_of_no_energy,
+            CritterSprite.died_of_old_age,
+        )
+        if show_profile_panel():
+            return values + profiler.panel_values()
+        return values
+
+    def spawn_food(self, current_update, interval, count):
+        """
+        Periodically spawns new food in the environment - this simulates the growth of new
+        plants that critters can then consume. Spawning is counted in updates rather than
+        seconds so that a seeded run can be reproduced exactly, however fast it runs.
+        @param current_update The number of updates that have taken place so far.
+        @param interval The number of updates between spawning food.
+        @param count The number of food items to spawn.
+        """
+        # Check if it's time to spawn new food
+        if current_update and current_update % max(1, interval) == 0:
+            # Create new food items.
+            self.create_food(count)
+
+    def critter_count(self):
+        """
+        Returns the number of living critters, whichever engine is in use.
+        """
+        return self.population_stats().count
+
+    def food_count(self):
+        """
+        Returns the number of items of food, wherever they are held.
+        """
+        if self.sharded_world is not None:
+            return self.sharded_world.food_count
+        return len(self.food_group)
+
+    def create_births(self):
+        """
+        Creates the critters conceived during the update that has just run, up to the
+        population cap. This is done after every critter has been updated so that
+        critters_group does not change while it is being iterated.
+        """
+        room = config.critter_max_population - len(self.critters_group)
+        for x_pos, y_pos, genes, parents in births.take(room):
+            critter = CritterSprite.create(x_pos, y_pos, genes, parents)
+            critter.add(self.critters_group, self.render_groups)
+
+    def step(self):
+        """
+        Advances the simulation by a single update. Nothing is drawn here so that the
+        same update can be used with or without a display.
+        """
+        events.tick = self.update_count
+        lineage.advance(self.update_count)
+
+        with profiler.phase("update"):
+            if self.sharded_world is not None:
+                self.sharded_world.step(self.update_count)
+            elif self.critter_engine is not None:
+                self.critter_engine.step(SpriteFood(self.food_group), self.update_count)
+            else:
+                critters_group = self.critters_group
+                population = len(critters_group)
+                self.mating_grid.rebuild_positions(critters_group)
+                food_grid = None
+                if self.movement is UpdateMethod.TOWARDS:
+                    food_grid = self.food_grid
+                    food_grid.rebuild(self.food_group)
+                critters_group.update(self.movement, self.food_group, self.mating_grid,
+                                      self.update_count, food_grid)
+                critters_group.stats.age_all(population)
+                self.create_births()
+
+        with profiler.phase("spawn"):
+            self.spawn_food(self.update_count, config.food_respawn_interval, config.food_respawn_count)
+
+        tick_counters.flush(self.update_count, log)
+        self.update_count += 1
+
+        if (self.checkpoint_writer is not None and self.checkpoint_interval
+                and self.update_count % self.checkpoint_interval == 0):
+            self.checkpoint_writer.save(self.capture_state())
+
+        if self.metrics_recorder is not None and self.update_count % config.metrics_interval == 0:
+            self.record_metrics()
+
+    def population_arrays(self):
+        """
+        Returns arrays of every living critter's age, genes (one row per critter, in the
+        order of GENE_NAMES) and energy. When the world is split between workers only the
+        counts are known here, so the arrays are empty.
+        """
+        engine = self.critter_engine
+        if engine is not None:
+            count = engine.count
+            return engine.age[:count], engine.genes[:count], engine.energy[:count]
+        if self.sharded_world is not None:
+            return np.empty(0, dtype=np.int64), np.empty((0, len(GENE_NAMES))), np.empty(0)
+        critters = self.critters_group.sprites()
+        count = len(critters)
+        ages = np.fromiter((critter.age for critter in critters), np.int64, count)
+        genes = np.array(
+            [[critter.genes[name] for name in GENE_NAMES] for critter in critters], dtype=np.float64
+        ).reshape(count, len(GENE_NAMES))
+        energy = np.fromiter((critter.energy for critter in critters), np.float64, count)
+        return ages, genes, energy
+
+    def record_metrics(self):
+        """
+        Samples the population into the metrics recorder.
+        """
+        ages, genes, energy = self.population_arrays()
+        self.metrics_recorder.record(self.update_count, self.critter_count(), self.food_count(),
+                                     CritterSprite.died_of_old_age,
+                                     CritterSprite.died_of_no_energy, ages, genes, energy)
+
+    def capture_state(self):
+        """
+        Returns a copy of the whole simulation state, in the form written to checkpoints.
+        """
+        engine = self.critter_engine
+        rng_state = {"simulation": rng.getstate(),
+                     "food": self.food_growth.generator.bit_generator.state}
+        if engine is not None:
+            critters = engine.export_state(np.arange(engine.count))
+            critter_next_id = engine.next_id
+            birth_ordered = engine.birth_ordered
+            rng_state["engine"] = engine.rng.bit_generator.state
+        else:
+            critters = CritterSprite.export_all(self.critters_group)
+            critter_next_id = CritterSprite.next_id
+            birth_ordered = True
+        return {
+            "critters": critters,
+            "food": FoodSprite.export_all(self.food_group),
+            "rng_state": rng_state,
+            "engine": "numpy" if engine is not None else "sprite",
+            "update_count": self.update_count,
+            "died_of_old_age": CritterSprite.died_of_old_age,
+            "died_of_no_energy": CritterSprite.died_of_no_energy,
+            "critter_next_id": critter_next_id,
+            "food_next_id": FoodSprite.next_id,
+            "birth_ordered": birth_ordered,
+            "food_fertility": self.food_growth.fertility.copy(),
+        }
+
+    def restore_state(self, state):
+        """
+        Rebuilds the world from a checkpoint instead of populating it. Sprites are
+        recreated directly from the stored columns rather than through their
+        constructors, and the random number generators carry on from where they were. A
+        checkpoint from either engine can be resumed with either engine, but the critter
+        engine's own generator is only restored when the engines match.
+        """
+        if self.sharded_world is not None:
+            raise ValueError("Checkpoints are not supported when the world is split between workers")
+        self.update_count = state["update_count"]
+        CritterSprite.died_of_old_age = state["died_of_old_age"]
+        CritterSprite.died_of_no_energy = state["died_of_no_energy"]
+        FoodSprite.next_id = state["food_next_id"]
+        version, internal_state, gauss_next = state["rng_state"]["simulation"]
+        rng.setstate((version, tuple(internal_state), gauss_next))
+        self.food_growth.generator.bit_generator.state = state["rng_state"]["food"]
+        self.food_growth.fertility = state["food_fertility"]
+
+        food_sprites = FoodSprite.restore_all(state["food"])
+        for group in (self.food_group, *self.render_groups):
+            group.add(food_sprites)
+
+        engine = self.critter_engine
+        if engine is not None:
+            engine.restore(state["critters"], state["critter_next_id"], state["birth_ordered"])
+            if "engine" in state["rng_state"]:
+                engine.rng.bit_generator.state = state["rng_state"]["engine"]
+        else:
+            critters = CritterSprite.restore_all(state["critters"])
+            if not state["birth_ordered"]:
+                # The oldest critter must come first for the running population statistics.
+                critters.sort(key=lambda critter: -critter.age)
+            CritterSprite.next_id = state["critter_next_id"]
+            for group in (self.critters_group, *self.render_groups):
+                group.add(critters)
+
+        # The lineage of a resumed run starts from the critters in the checkpoint.
+        order = np.argsort(state["critters"]["ids"])
+        lineage.tick = self.update_count
+        lineage.record_births(state["critters"]["ids"][order], None, state["critters"]["genes"][order])
+
+    def run(self, max_ticks=0, report_interval=0):
+        """
+        Runs the simulation, in its window if a renderer is attached and headless
+        otherwise.
+        @param max_ticks The number of updates to run before stopping, or 0 to run until
+        the window is closed or the run is interrupted.
+        @param report_interval The number of updates between progress reports, or 0 for
+        none.
+        """
+        if self.snapshots is not None:
+            self._run_pipelined(max_ticks, report_interval)
+        elif self.renderer is not None:
+            self._run_windowed(max_ticks, report_interval)
+        else:
+            self._run_headless(max_ticks, report_interval)
+
+    def _end_frame(self):
+        """
+        Closes the profiler's record of the current frame, logging where a cProfile trace
+        was written if one has just finished.
+        """
+        trace_path = profiler.end_frame(self.update_count)
+        if trace_path:
+            log.info(f"Wrote a cProfile trace of {config.profile_trace_frames} frames to {trace_path}")
+
+    def _run_windowed(self, max_ticks, report_interval):
+        """
+        Runs the simulation in a window, drawing every update and capping the frame rate.
+        The frame rate is logged every report_interval updates. Pressing P traces the next
+        few frames with cProfile.
+        """
+        clock = pygame.time.Clock()
+        running = True
+
+        while running:
+            with profiler.phase("events"):
+                for event in pygame.event.get():
+                    if event.type == pygame.QUIT:
+                        running = False
+                    elif event.type == pygame.KEYDOWN and event.key == pygame.K_p:
+                        if not profiler.tracing:
+                            log.info(f"Tracing {config.profile_trace_frames} frames with cProfile")
+                            profiler.start_trace(config.profile_trace_frames)
+                    elif self.camera is not None:
+                        self.camera.handle_event(event)
+
+            self.step()
+
+            with profiler.phase("render"):
+                # The camera renderer draws from arrays rather than from sprites.
+                if self.camera is None and self.critter_engine is not None:
+                    self.critter_engine.sync_views()
+                elif self.camera is None and self.sharded_world is None:
+                    CritterSprite.sync_rects(self.critters_group)
+                self.renderer.draw(self.sidebar_values())
+
+            with profiler.phase("wait"):
+                clock.tick(config.simulation_frame_rate)
+
+            self._end_frame()
+
+            if report_interval and self.update_count % report_interval == 0:
+                log.info(f"Tick {self.update_count}: {clock.get_fps():.1f} frames per second")
+                if profiler.enabled:
+                    log.info(profiler.summary())
+
+            if max_ticks and self.update_count >= max_ticks:
+                running = False
+
+    def _run_headless(self, max_ticks, report_interval, stop=None):
+        """
+        Runs the simulation without a window as fast as the CPU allows. Nothing is drawn
+        and the update rate is not capped. The number of updates per second is logged
+        every report_interval updates and once more when the run ends.
+        @param stop A threading.Event that stops the run when set, when the simulation
+        runs on its own thread and publishes snapshots for the render loop to draw.
+        """
+        start_time = time.perf_counter()
+        report_time = time.perf_counter()
+        report_ticks = self.update_count
+        first_tick = self.update_count
+
+        try:
+            while not max_ticks or self.update_count < max_ticks:
+                self.step()
+                self._end_frame()
+
+                if stop is not None:
+                    if self.snapshots.wanted:
+                        self.publish_snapshot()
+                    if stop.is_set():
+                        break
+                # While the display module is initialised SDL turns Ctrl+C into a QUIT
+                # event instead of a KeyboardInterrupt, so check for one now and then.
+                elif self.update_count % 64 == 0 and pygame.display.get_init():
+                    if pygame.event.peek(pygame.QUIT):
+                        break
+
+                if report_interval and self.update_count % report_interval == 0:
+                    now = time.perf_counter()
+                    rate = (self.update_count - report_ticks) / (now - report_time)
+                    log.info(
+                        f"Tick {self.update_count}: {rate:.1f} ticks per second, "
+                        f"{self.critter_count()} critters, {self.food_count()} food"
+                    )
+                    report_time = now
+                    report_ticks = self.update_count
+                    if profiler.enabled:
+                        log.info(profiler.summary())
+        except KeyboardInterrupt:
+            pass
+
+        elapsed = time.perf_counter() - start_time
+        ticks = self.update_count - first_tick
+        rate = ticks / elapsed if elapsed > 0 else 0
+        label = "Headless run" if stop is None else "Simulation thread"
+        log.info(
+            f"{label} finished: {ticks} ticks in {elapsed:.2f}s ({rate:.1f} ticks per second)"
+        )
+
+    def publish_snapshot(self):
+        """
+        Publishes the current state of the world for the render loop to draw.
+        """
+        self.snapshots.publish(self.update_count, self.food, self.critters, self.sidebar_values())
+
+    def _run_pipelined(self, max_ticks, report_interval):
+        """
+        Runs the simulation on its own thread as fast as it can go, while this thread
+        draws the newest snapshot it has published, capped at the frame rate, so that
+        neither a slow update nor a slow flip holds the other up. The frame rate is
+        logged every report_interval frames.
+        """
+        stop = threading.Event()
+        errors = []
+
+        def simulate():
+            try:
+                self._run_headless(max_ticks, report_interval, stop)
+            except Exception as error:  # pylint: disable=W0718
+                errors.append(error)
+            finally:
+                # Show the final state, whether or not the reader took the last one.
+                self.publish_snapshot()
+
+        self.publish_snapshot()
+        thread = threading.Thread(target=simulate, name="simulation")
+        thread.start()
+        clock = pygame.time.Clock()
+        frames = 0
+        try:
+            while thread.is_alive():
+                for event in pygame.event.get():
+                    if event.type == pygame.QUIT:
+                        stop.set()
+                    elif self.camera is not None:
+                        self.camera.handle_event(event)
+
+                self.snapshots.acquire()
+                self.renderer.draw(self.snapshots.sidebar_values)
+                clock.tick(config.simulation_frame_rate)
+
+                frames += 1
+                if report_interval and frames % report_interval == 0:
+                    log.info(f"Frame {frames} (tick {self.snapshots.current.tick}): "
+                             f"{clock.get_fps():.1f} frames per second")
+        finally:
+            stop.set()
+            thread.join()
+        if errors:
+            raise errors[0]
+
+    def close(self):
+        """
+        Writes a last checkpoint and any outstanding metrics, closes the event log and
+        the worker processes, and shuts pygame down if a renderer was attached.
+        """
+        if self.checkpoint_writer is not None:
+            # Save the final state, unless the last update has just saved it.
+            if not self.checkpoint_interval or self.update_count % self.checkpoint_interval:
+                self.checkpoint_writer.save(self.capture_state())
+            self.checkpoint_writer.close()
+            self.checkpoint_writer = None
+
+        if self.metrics_recorder is not None:
+            self.metrics_recorder.close()
+            if self.metrics_recorder.dropped:
+                log.warning(f"{self.metrics_recorder.dropped} metrics samples were dropped")
+            self.metrics_recorder = None
+
+        events.close()
+        if self.lineage_file:
+            lineage.stop()
+            lineage.save(self.lineage_file)
+            log.info(f"Lineage of {lineage.count} critters written to {self.lineage_file}")
+            self.lineage_file = ""
+        if self.sharded_world is not None:
+            self.sharded_world.close()
+            self.sharded_world = None
+
+        if self.renderer is not None:
+            self.renderer = None
+            pygame.quit()
+
+
+def get_initial_critter_values():
+    """
+    Generates initial random values for critter attributes. This is only done
+    once when the simulation is populated. After this point, genes are used to
+    update critter attributes.
+    """
+    energy = rng.uniform(config.critter_min_energy, config.critter_max_energy)
+    size = rng.randint(config.critter_min_size, config.critter_max_size)
+    speed = rng.uniform(config.critter_min_speed, config.critter_max_speed)
+    return energy, size, speed
+
+
+def show_profile_panel() -> bool:
+    """
+    Returns True if the sidebar should show the time taken by each phase.
+    """
+    return profiler.enabled and config.profile_panel
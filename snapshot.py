@@ -0,0 +1,168 @@
+"""
+World snapshots for drawing the simulation while it runs on another thread. The
+simulation copies the positions, sizes and colours of everything into a snapshot, and
+the render loop draws the newest complete snapshot, so neither waits for the other.
+"""
+
+import threading
+import numpy as np
+
+
+class Snapshot:
+    """
+    A copy of everything needed to draw one update: the food and critters in the form
+    that ArrayRenderer draws, and the sidebar values. The arrays are reused from one
+    snapshot to the next and only grow, so taking a snapshot allocates nothing once the
+    population has settled.
+    """
+
+    def __init__(self, capacity=1024):
+        """
+        Constructor for the Snapshot class.
+        @param capacity The number of critters and of items of food to allocate space for
+        initially.
+        """
+        self.tick = 0
+        self.sidebar_values = ()
+        self._food = np.zeros((3, capacity))
+        self._critter_positions = np.zeros((3, capacity))
+        self._critter_colours = np.zeros((2, capacity), dtype=np.uint8)
+        self._food_count = 0
+        self._critter_count = 0
+
+    @property
+    def food(self) -> list:
+        """
+        Read-only: Returns the food as a list of one (x, y, size) tuple of arrays.
+        """
+        return [tuple(self._food[:, : self._food_count])]
+
+    @property
+    def critters(self) -> list:
+        """
+        Read-only: Returns the critters as a list of one (x, y, size, red, blue) tuple of
+        arrays.
+        """
+        count = self._critter_count
+        return [(*self._critter_positions[:, :count], *self._critter_colours[:, :count])]
+
+    def write(self, tick, food, critters, sidebar_values):
+        """
+        Copies the state of the world into the snapshot.
+        @param tick The number of updates that have taken place so far.
+        @param food A list of (x, y, size) arrays.
+        @param critters A list of (x, y, size, red, blue) arrays.
+        @param sidebar_values The value for each line of the sidebar.
+        """
+        self.tick = tick
+        self.sidebar_values = tuple(sidebar_values)
+        self._food, self._food_count = _copy_columns(self._food, food)
+        positions = [columns[:3] for columns in critters]
+        colours = [columns[3:] for columns in critters]
+        self._critter_positions, self._critter_count = _copy_columns(self._critter_positions, positions)
+        self._critter_colours, _ = _copy_columns(self._critter_colours, colours)
+
+
+def _copy_columns(buffer, chunks):
+    """
+    Copies chunks of columns one after another into the rows of a buffer, growing the
+    buffer if they do not fit.
+    @return The buffer, which may be a new one, and the number of values in each row.
+    """
+    count = sum(len(columns[0]) for columns in chunks)
+    if count > buffer.shape[1]:
+        buffer = np.zeros((buffer.shape[0], max(count, buffer.shape[1] * 2)), dtype=buffer.dtype)
+    start = 0
+    for columns in chunks:
+        end = start + len(columns[0])
+        for row, values in enumerate(columns):
+            buffer[row, start:end] = values
+        start = end
+    return buffer, count
+
+
+class SnapshotBuffer:
+    """
+    Triple buffered snapshots passed from one writer thread to one reader thread. The
+    writer fills a snapshot that the reader is not using and publishes it; the reader
+    takes the newest published snapshot and keeps it until it asks for another. With
+    three snapshots there is always one free for the writer, so neither thread ever
+    waits for the other, and the lock is only held to swap indices.
+    The reader draws the snapshot it holds through the food, critters and
+    sidebar_values attributes, so the buffer can be handed to a renderer as its world.
+    """
+
+    def __init__(self, capacity=1024):
+        """
+        Constructor for the SnapshotBuffer class.
+        @param capacity The initial capacity of each snapshot.
+        """
+        self._snapshots = [Snapshot(capacity) for _ in range(3)]
+        self._lock = threading.Lock()
+        self._writing = 0
+        self._latest = None
+        self._reading = None
+        self._fresh = False
+
+    @property
+    def wanted(self) -> bool:
+        """
+        Read-only: True if the reader has taken the newest snapshot, so that publishing
+        another one would be seen. The writer can skip snapshots while this is False.
+        """
+        return not self._fresh
+
+    def publish(self, tick, food, critters, sidebar_values):
+        """
+        Writes a snapshot (see Snapshot.write) and makes it the newest. Called by the
+        writer thread.
+        """
+        with self._lock:
+            self._writing = next(
+                index for index in range(len(self._snapshots))
+                if index not in (self._latest, self._reading)
+            )
+        self._snapshots[self._writing].write(tick, food, critters, sidebar_values)
+        with self._lock:
+            self._latest = self._writing
+            self._fresh = True
+
+    def acquire(self) -> bool:
+        """
+        Switches the reader to the newest published snapshot. Called by the reader thread.
+        @return False if nothing has been published yet.
+        """
+        with self._lock:
+            if self._latest is None:
+                return False
+            self._reading = self._latest
+            self._fresh = False
+        return True
+
+    @property
+    def current(self) -> Snapshot:
+        """
+        Read-only: Returns the snapshot the reader holds.
+        """
+        return self._snapshots[self._reading]
+
+    @property
+    def food(self) -> list:
+        """
+        Read-only: Returns the food of the snapshot the reader holds.
+        """
+        return self.current.food
+
+    @property
+    def critters(self) -> list:
+        """
+        Read-only: Returns the critters of the snapshot the reader holds.
+        """
+        return self.current.critters
+
+    @property
+    def sidebar_values(self) -> tuple:
+        """
+        Read-only: Returns the sidebar values of the snapshot the reader holds.
+        """
+        return self.current.sidebar_values
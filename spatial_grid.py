@@ -0,0 +1,162 @@
+"""
+Spatial hashing used to limit proximity searches to nearby sprites.
+"""
+
+import pygame
+
+
+class SpatialGrid:
+    """
+    A uniform bucket grid. Each item is stored in the cell containing its position, so a
+    query only has to visit the cells surrounding a point instead of every item.
+    The cell size should be at least the largest search radius so that the 3x3 block of
+    cells around a point is guaranteed to contain every candidate.
+    """
+
+    def __init__(self, cell_size):
+        """
+        Constructor for the SpatialGrid class.
+        @param cell_size The width and height of each grid cell.
+        """
+        self.cell_size = max(1, int(cell_size))
+        self.cells = {}
+
+    def cell_of(self, x, y):
+        """
+        Returns the key of the cell that contains the point (x, y).
+        """
+        return int(x // self.cell_size), int(y // self.cell_size)
+
+    def clear(self):
+        """
+        Removes all items from the grid.
+        """
+        self.cells.clear()
+
+    def insert(self, item, x, y):
+        """
+        Adds an item to the cell that contains the point (x, y).
+        """
+        key = self.cell_of(x, y)
+        bucket = self.cells.get(key)
+        if bucket is None:
+            self.cells[key] = [item]
+        else:
+            bucket.append(item)
+
+    def rebuild(self, sprites):
+        """
+        Clears the grid and re-inserts every sprite at the top left corner of its rect.
+        This is done once per update so that queries see the current positions.
+        @param sprites An iterable of sprites, typically a sprite group.
+        """
+        self.cells.clear()
+        for sprite in sprites:
+            self.insert(sprite, sprite.rect.x, sprite.rect.y)
+
+    def rebuild_positions(self, items):
+        """
+        Clears the grid and re-inserts every item at the point given by its x and y
+        attributes, for items such as critters whose rects are not kept up to date.
+        @param items An iterable of items, typically a sprite group.
+        """
+        self.cells.clear()
+        for item in items:
+            self.insert(item, item.x, item.y)
+
+    def nearby(self, x, y):
+        """
+        Yields every item stored in the 3x3 block of cells around the point (x, y).
+        """
+        cx, cy = self.cell_of(x, y)
+        cells = self.cells
+        for gx in (cx - 1, cx, cx + 1):
+            for gy in (cy - 1, cy, cy + 1):
+                bucket = cells.get((gx, gy))
+                if bucket:
+                    yield from bucket
+
+
+class SpatialGroup(pygame.sprite.Group):
+    """
+    A sprite group that keeps a persistent spatial index of its members. Sprites are
+    indexed by every cell that their rect overlaps when they are added, and are removed
+    from the index when they leave the group (including through kill()), so the index
+    is only valid for sprites that do not move while they are in the group.
+    """
+
+    def __init__(self, cell_size, *sprites):
+        """
+        Constructor for the SpatialGroup class.
+        @param cell_size The width and height of each grid cell.
+        @param sprites Any sprites to add to the group immediately.
+        """
+        self.cell_size = max(1, int(cell_size))
+        self.cells = {}
+        self._sprite_cells = {}
+        self._sprite_order = {}
+        self._next_order = 0
+        super().__init__(*sprites)
+
+    def cells_for_rect(self, rect):
+        """
+        Returns the keys of every cell that the rect overlaps.
+        @param rect A pygame.Rect or a (left, top, width, height) tuple of integers.
+        """
+        size = self.cell_size
+        left, top, width, height = rect
+        right = max(left, left + width - 1) // size
+        bottom = max(top, top + height - 1) // size
+        left //= size
+        top //= size
+        return [(gx, gy) for gx in range(left, right + 1) for gy in range(top, bottom + 1)]
+
+    def add_internal(self, sprite, layer=None):
+        """
+        Adds the sprite to the group and to every cell that its rect overlaps.
+        """
+        super().add_internal(sprite, layer)
+        keys = self.cells_for_rect(sprite.rect)
+        for key in keys:
+            bucket = self.cells.get(key)
+            if bucket is None:
+                self.cells[key] = {sprite: None}
+            else:
+                bucket[sprite] = None
+        self._sprite_cells[sprite] = keys
+        self._sprite_order[sprite] = self._next_order
+        self._next_order += 1
+
+    def remove_internal(self, sprite):
+        """
+        Removes the sprite from the group and from the spatial index.
+        """
+        super().remove_internal(sprite)
+        for key in self._sprite_cells.pop(sprite):
+            bucket = self.cells[key]
+            del bucket[sprite]
+            if not bucket:
+                del self.cells[key]
+        del self._sprite_order[sprite]
+
+    def collide_any(self, rect):
+        """
+        Returns the first member of the group whose rect collides with the given rect,
+        or None. Only members that share a cell with the rect are tested, and ties are
+        broken by the order in which members were added, so the result is the same as
+        pygame.sprite.spritecollideany over the whole group.
+        @param rect A pygame.Rect or a (left, top, width, height) tuple of integers.
+        """
+        rect = pygame.Rect(rect)
+        cells = self.cells
+        order = self._sprite_order
+        found = None
+        for key in self.cells_for_rect(rect):
+            bucket = cells.get(key)
+            if bucket:
+                for candidate in bucket:
+                    if (found is None or order[candidate] < order[found]) and rect.colliderect(
+                        candidate.rect
+                    ):
+                        found = candidate
+        return found
@@ -0,0 +1,35 @@
+"""
+Free lists of dead sprites, so that new sprites can reuse them instead of being
+allocated.
+"""
+
+
+class SpritePool:
+    """
+    Holds sprites that have been killed until they are reinitialised as new sprites.
+    The pool is bounded so that a sudden die-off does not hold on to every sprite.
+    """
+
+    def __init__(self, max_size):
+        """
+        Constructor for the SpritePool class.
+        @param max_size The largest number of dead sprites to keep.
+        """
+        self.max_size = max_size
+        self.free = []
+
+    def __len__(self):
+        return len(self.free)
+
+    def acquire(self):
+        """
+        Returns a dead sprite to reinitialise, or None if the pool is empty.
+        """
+        return self.free.pop() if self.free else None
+
+    def release(self, sprite):
+        """
+        Returns a sprite that has been killed to the pool, unless the pool is full.
+        """
+        if len(self.free) < self.max_size:
+            self.free.append(sprite)
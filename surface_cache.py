@@ -0,0 +1,58 @@
+'''
+A cache of plain coloured surfaces that is shared by every sprite. Sprites of the same
+size and (quantised) colour draw the same surface, so a new surface is only created
+the first time a size and colour is needed, and sprites never fill their own images.
+'''
+from collections import OrderedDict
+import pygame
+from config import config
+
+
+class SurfaceCache:
+    '''
+    A least recently used cache of solid colour surfaces keyed by (size, colour).
+    Surfaces handed out by the cache are shared and must not be drawn on.
+    '''
+
+    def __init__(self, max_surfaces: int, colour_levels: int):
+        '''
+        Constructor for the SurfaceCache class.
+        @param max_surfaces The number of surfaces to keep before the least recently used
+        one is evicted.
+        @param colour_levels The number of distinct values kept for each colour channel.
+        '''
+        self.max_surfaces = max(1, max_surfaces)
+        self.step = max(1, 256 // max(1, colour_levels))
+        self._surfaces = OrderedDict()
+
+    def quantise(self, colour) -> tuple:
+        '''
+        Returns the colour rounded to the nearest of the cache's colour levels.
+        '''
+        step = self.step
+        return tuple(min(255, (channel + step // 2) // step * step) for channel in colour)
+
+    def get(self, size: int, colour) -> pygame.Surface:
+        '''
+        Returns a shared surface of the given size filled with the colour. The colour
+        should already have been quantised, so that similar colours share a surface.
+        @param size The width and height of the surface.
+        @param colour The colour of the surface.
+        '''
+        key = (size, colour)
+        surface = self._surfaces.get(key)
+        if surface is None:
+            surface = pygame.Surface((size, size))
+            surface.fill(colour)
+            self._surfaces[key] = surface
+            if len(self._surfaces) > self.max_surfaces:
+                self._surfaces.popitem(last=False)
+        else:
+            self._surfaces.move_to_end(key)
+        return surface
+
+    def __len__(self):
+        return len(self._surfaces)
+
+
+surface_cache = SurfaceCache(config.render_surface_cache_size, config.render_colour_levels)
@@ -0,0 +1,283 @@
+"""
+Parameter sweeps. Runs many headless simulations in parallel, each with its own config
+overrides and seed, and appends a summary of each run to one CSV results table. Runs
+already in the table are skipped, so an interrupted sweep carries on where it stopped.
+
+For example, three energy scales crossed with 20 random mating cooldowns, five seeds each:
+
+    python sweep.py --grid critter.energy_scale=0.0003,0.0005,0.0008 \\
+        --sample critter.mating_cooldown=500:1500 --samples 20 --repeats 5
+"""
+
+import argparse
+import concurrent.futures
+import csv
+import itertools
+import multiprocessing
+import os
+import sys
+import time
+
+# Every run imports pygame in its own process, which would print its greeting each time.
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+# pylint: disable=C0413
+import numpy as np
+import toml
+import config as config_module
+from config import config
+
+log = config.logger
+
+# The columns of the results table that follow the run, seed and override columns.
+SUMMARY_COLUMNS = (
+    "ticks", "extinct", "survival_ticks", "final_population", "peak_population",
+    "final_food", "births", "died_of_old_age", "died_of_no_energy",
+)
+
+
+def parse_value(text):
+    """
+    Returns the value of a config override given on the command line, typed as it would
+    be in config.toml (so "3" is an int, "0.5" a float, "true" a bool and "full" a string).
+    """
+    try:
+        return toml.loads(f"value = {text}")["value"]
+    except toml.TomlDecodeError:
+        return text
+
+
+def parse_assignments(options, separator):
+    """
+    Parses "section.key=..." options into a dict of the key and its list of values.
+    @param options The option strings.
+    @param separator The separator between values, "," for grid values or ":" for the
+    two ends of a range.
+    """
+    parsed = {}
+    for option in options:
+        key, equals, values = option.partition("=")
+        if not equals:
+            raise ValueError(f"Expected section.key=values, not {option}")
+        parsed[key.strip()] = [parse_value(value.strip()) for value in values.split(separator)]
+    return parsed
+
+
+def plan_runs(grid, ranges, samples, seed, repeats):
+    """
+    Returns every run of a sweep, in a fixed order so that a restarted sweep plans the
+    same runs.
+    @param grid A dict of each swept setting and the values to try. Every combination of
+    values is run.
+    @param ranges A dict of each sampled setting and its [low, high] range. Each
+    combination of grid values is run with samples points drawn uniformly from the
+    ranges. Integer ranges are sampled as integers, including high.
+    @param samples The number of points to draw from the ranges.
+    @param seed The seed of the first repeat of each point. The ranges are sampled with
+    it too.
+    @param repeats The number of seeds to run each point with. The seeds are the same
+    for every point, so that points are compared on the same random worlds.
+    @return A list of dicts of the run's index, seed and config overrides.
+    """
+    generator = np.random.default_rng(seed)
+    points = []
+    for values in itertools.product(*grid.values()):
+        point = dict(zip(grid, values))
+        if not ranges:
+            points.append(point)
+            continue
+        for _ in range(samples):
+            sampled = dict(point)
+            for key, (low, high) in ranges.items():
+                if isinstance(low, int) and isinstance(high, int):
+                    sampled[key] = int(generator.integers(low, high, endpoint=True))
+                else:
+                    sampled[key] = float(generator.uniform(low, high))
+            points.append(sampled)
+
+    runs = []
+    for point in points:
+        for repeat in range(repeats):
+            runs.append({"run": len(runs), "seed": seed + repeat, "overrides": point})
+    return runs
+
+
+def run_experiment(config_path, overrides, seed, ticks, engine) -> dict:
+    """
+    Runs one headless simulation and summarises it. This must run in a fresh process:
+    the overridden config replaces the global one before any simulation module is
+    imported, so every module sees the same Config instance.
+    @param config_path The config file that the overrides apply to.
+    @param overrides A dict of config values keyed by "section.key".
+    @param seed The random seed.
+    @param ticks The number of updates to run, unless every critter dies first.
+    @param engine The critter engine, "sprite" or "numpy".
+    @return The summary, keyed by SUMMARY_COLUMNS and the gene drift columns.
+    """
+    config_module.config = config_module.Config.load(config_path, overrides)
+    # Only the sweep's own progress is logged.
+    config_module.config.logger.remove()
+    # pylint: disable=C0415
+    from creature_sprite import CritterSprite, GENE_NAMES
+    from simulation import Simulation
+
+    simulation = Simulation(engine=engine, seed=seed)
+    simulation.populate()
+    initial_count = simulation.critter_count()
+    initial_genes = gene_means(simulation.population_arrays()[1])
+    peak = initial_count
+    extinct = False
+    while simulation.update_count < ticks:
+        simulation.step()
+        population = simulation.critter_count()
+        peak = max(peak, population)
+        if population == 0:
+            extinct = True
+            break
+
+    final_count = simulation.critter_count()
+    died_of_old_age = CritterSprite.died_of_old_age
+    died_of_no_energy = CritterSprite.died_of_no_energy
+    summary = {
+        "ticks": ticks,
+        "extinct": int(extinct),
+        "survival_ticks": simulation.update_count,
+        "final_population": final_count,
+        "peak_population": peak,
+        "final_food": simulation.food_count(),
+        "births": final_count + died_of_old_age + died_of_no_energy - initial_count,
+        "died_of_old_age": died_of_old_age,
+        "died_of_no_energy": died_of_no_energy,
+    }
+    drift = gene_means(simulation.population_arrays()[1]) - initial_genes
+    for name, value in zip(GENE_NAMES, drift.tolist()):
+        summary[f"gene_{name}_drift"] = value
+    simulation.close()
+    return summary
+
+
+def gene_means(genes):
+    """
+    Returns the mean of each gene over a population, or NaN for an empty population.
+    """
+    if len(genes) == 0:
+        return np.full(genes.shape[1], np.nan)
+    return genes.mean(axis=0)
+
+
+def completed_runs(path, columns, runs, keys) -> set:
+    """
+    Returns the indices of the runs already in a results table.
+    @param path The results table, which need not exist yet.
+    @param columns The columns that the table must have.
+    @param runs The planned runs, whose seeds and overrides the table's runs must match.
+    @param keys The overridden settings, in the order of their columns.
+    """
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return set()
+    with open(path, newline="", encoding="utf-8") as results_file:
+        reader = csv.reader(results_file)
+        if tuple(next(reader)) != columns:
+            raise ValueError(f"{path} has different columns; it is from a different sweep")
+        done = set()
+        for row in reader:
+            run = int(row[0])
+            if (run >= len(runs) or int(row[1]) != runs[run]["seed"]
+                    or row[2: 2 + len(keys)] != [str(runs[run]["overrides"][key]) for key in keys]):
+                raise ValueError(f"{path} holds runs that this sweep did not plan")
+            done.add(run)
+    return done
+
+
+def parse_args(argv):
+    """
+    Parses the command line.
+    @param argv The command line arguments, excluding the program name.
+    """
+    parser = argparse.ArgumentParser(description="Run a parameter sweep of headless simulations.")
+    parser.add_argument("--grid", action="append", default=[], metavar="SECTION.KEY=V1,V2,...",
+                        help="A setting and the values to try. Every combination is run.")
+    parser.add_argument("--sample", action="append", default=[], metavar="SECTION.KEY=LOW:HIGH",
+                        help="A setting to draw --samples values for, uniformly from a range.")
+    parser.add_argument("--samples", type=int, default=10,
+                        help="Points drawn from the --sample ranges for each grid combination.")
+    parser.add_argument("--repeats", type=int, default=1, help="Seeds to run each point with.")
+    parser.add_argument("--seed", type=int, default=1, help="The seed of each point's first run.")
+    parser.add_argument("--ticks", type=int, default=5000,
+                        help="Updates to run each simulation for, unless it dies out first.")
+    parser.add_argument("--engine", choices=("sprite", "numpy"), default=config.simulation_engine)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Simulations to run at once.")
+    parser.add_argument("--config", default="config.toml", help="The config file to override.")
+    parser.add_argument("--output", default="sweep.csv",
+                        help="CSV results table. Runs already in it are skipped.")
+    args = parser.parse_args(argv)
+    if args.ticks <= 0 or args.workers <= 0 or args.repeats <= 0 or args.samples <= 0:
+        parser.error("--ticks, --workers, --repeats and --samples must be positive")
+    return args
+
+
+def main(argv):
+    """
+    Plans the sweep, runs every run that is not already in the results table, and
+    appends each run's summary as it finishes.
+    @param argv The command line arguments, excluding the program name.
+    """
+    # pylint: disable=C0415
+    from creature_sprite import GENE_NAMES
+
+    args = parse_args(argv)
+    grid = parse_assignments(args.grid, ",")
+    ranges = parse_assignments(args.sample, ":")
+    for key, values in ranges.items():
+        if len(values) != 2:
+            raise ValueError(f"Expected a LOW:HIGH range for {key}")
+    # Check every override against the config before starting any processes.
+    for key, values in itertools.chain(grid.items(), ranges.items()):
+        for value in values:
+            config_module.Config.load(args.config, {key: value})
+
+    runs = plan_runs(grid, ranges, args.samples, args.seed, args.repeats)
+    keys = tuple(grid) + tuple(key for key in ranges if key not in grid)
+    columns = ("run", "seed", *keys, *SUMMARY_COLUMNS,
+               *(f"gene_{name}_drift" for name in GENE_NAMES))
+    done = completed_runs(args.output, columns, runs, keys)
+    pending = [run for run in runs if run["run"] not in done]
+    log.info(f"{len(runs)} runs planned, {len(done)} already done, {len(pending)} to run")
+    if not pending:
+        return
+
+    new_file = not os.path.exists(args.output) or os.path.getsize(args.output) == 0
+    # Each run gets a fresh process so that it can install its own config.
+    context = multiprocessing.get_context("spawn")
+    with concurrent.futures.ProcessPoolExecutor(args.workers, mp_context=context,
+                                                max_tasks_per_child=1) as pool, \
+            open(args.output, "a", newline="", encoding="utf-8") as results_file:
+        writer = csv.writer(results_file)
+        if new_file:
+            writer.writerow(columns)
+        futures = {
+            pool.submit(run_experiment, args.config, run["overrides"], run["seed"],
+                        args.ticks, args.engine): run
+            for run in pending
+        }
+        start = time.perf_counter()
+        try:
+            for finished, future in enumerate(concurrent.futures.as_completed(futures), 1):
+                run = futures[future]
+                summary = future.result()
+                writer.writerow([run["run"], run["seed"], *(run["overrides"][key] for key in keys),
+                                 *(summary[column] for column in columns[2 + len(keys):])])
+                results_file.flush()
+                elapsed = time.perf_counter() - start
+                log.info(f"Run {run['run']} finished ({finished}/{len(pending)}, "
+                         f"{elapsed / finished * (len(pending) - finished):.0f}s left)")
+        except KeyboardInterrupt:
+            log.warning("Interrupted; run the same command again to carry on")
+            for future in futures:
+                future.cancel()
+    log.info(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,47 @@
+"""
+Counters for events that happen too often to log one line each. Events are counted as
+they happen and each tick's counts are logged as a single line when the tick ends.
+"""
+
+
+class TickCounters:
+    """
+    Counts named events during a tick.
+    """
+
+    def __init__(self):
+        """
+        Constructor for the TickCounters class.
+        """
+        self.counts = {}
+
+    def count(self, name, amount=1):
+        """
+        Adds amount to the named counter for the current tick.
+        """
+        self.counts[name] = self.counts.get(name, 0) + amount
+
+    def flush(self, tick, logger):
+        """
+        Logs the current tick's counts as one debug line, if anything was counted, and
+        starts counting the next tick from zero.
+        @param tick The tick that has just ended.
+        @param logger The logger to write to.
+        """
+        if not self.counts:
+            return
+        summary = ", ".join(f"{amount} {name}" for name, amount in self.counts.items())
+        logger.debug(f"Tick {tick}: {summary}")
+        self.counts.clear()
+
+    def take(self) -> dict:
+        """
+        Returns the current tick's counts and starts counting from zero, so that counts
+        made in a worker process can be passed to the main process's counters.
+        """
+        counts = self.counts
+        self.counts = {}
+        return counts
+
+
+tick_counters = TickCounters()